@@ -0,0 +1,178 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Local OpenAI-compatible chat completions endpoint for benchmarks:
+#   python -m bench.fake_openai --port 8999 --latency 0.3 --tokens-per-sec 80
+# Classifier prompts (the ones asking for 'y', or for a JSON schema of booleans) are answered
+# from FakeOpenAI.answers, everything else gets a markdown text of up to completion_tokens words
+# (with a heading per section the prompt numbers, like the solution's).
+# Embeddings are hashed bags of words, so identical texts match and rewordings score lower.
+
+# Keyword in the classifier system prompt -> answer key
+CLASSIFIERS = {
+    "micro business": "is_small_biz", "require a dataset": "dataset_needed",
+    "data sufficient": "dataset_sufficient", "physical activity": "human_factors_detailed"
+}
+# The longest interview: dataset questions, detailed human factors questions
+DEFAULT_ANSWERS = {"is_small_biz": False, "dataset_needed": True, "dataset_sufficient": True,
+                   "human_factors_detailed": True}
+WORDS = ("model", "data", "pipeline", "team", "training", "deployment", "metrics", "workflow", "review", "**risk**")
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port: int = 0, latency: float = 0.2, tokens_per_sec: float = 100,
+                 completion_tokens: int = 300, answers: Optional[Dict[str, bool]] = None, error_rate: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.completion_tokens = completion_tokens
+        self.answers = {**DEFAULT_ANSWERS, **(answers or {})}
+        # Fraction of requests answered with a 429 (with Retry-After) or a 500
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+    def start(self) -> "FakeOpenAI":
+        threading.Thread(target=self.serve_forever, daemon=True, name="fake-openai").start()
+        return self
+
+    def completion(self, system_prompt: str, max_tokens: int, response_format: Optional[Dict[str, Any]] = None) -> str:
+        if response_format is not None:
+            properties = response_format["json_schema"]["schema"]["properties"]
+            return json.dumps({key: self.answers.get(key, False) for key in properties})
+        for keyword, key in CLASSIFIERS.items():
+            if keyword in system_prompt:
+                return "y" if self.answers[key] else ""
+        count = max(1, min(max_tokens, self.completion_tokens))
+        bullets = ["- " + " ".join(WORDS[i % len(WORDS)] for i in range(start, min(count, start + 12)))
+                   for start in range(0, count, 12)]
+        sections = re.findall(r"^\d+\. (.+?) - ", system_prompt, re.MULTILINE) or ["Analysis"]
+        per_section = -(-len(bullets) // len(sections))
+        lines = []
+        for i, title in enumerate(sections):
+            lines.append(f"## {title}")
+            lines.extend(bullets[i * per_section:(i + 1) * per_section])
+        return "\n".join(lines)
+
+    def embedding(self, text: str, dimensions: int) -> List[float]:
+        vector = [0.0] * dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode("utf-8")) % dimensions] += 1.0
+        return vector
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeOpenAI
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server._lock:
+            self.server.requests += 1
+        if random.random() < self.server.error_rate:
+            self._send_error()
+            return
+        if self.path.endswith("/embeddings"):
+            texts = [body["input"]] if isinstance(body["input"], str) else body["input"]
+            time.sleep(self.server.latency / 4)
+            tokens = sum(len(text) for text in texts) // 4
+            dimensions = body.get("dimensions") or 256
+            self._send_json({
+                "object": "list", "model": body["model"],
+                "data": [{"object": "embedding", "index": i, "embedding": self.server.embedding(text, dimensions)}
+                         for i, text in enumerate(texts)],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+            })
+            return
+        messages = body["messages"]
+        text = self.server.completion(messages[0]["content"], body.get("max_tokens") or 1024,
+                                      body.get("response_format"))
+        tokens = text.split(" ")
+        usage = {"prompt_tokens": sum(len(m["content"]) for m in messages) // 4, "completion_tokens": len(tokens)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        time.sleep(self.server.latency)
+        if body.get("stream"):
+            self._stream(tokens, usage, (body.get("stream_options") or {}).get("include_usage"))
+            return
+        time.sleep(len(tokens) / self.server.tokens_per_sec)
+        self._send_json({
+            "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _stream(self, tokens, usage, include_usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        delay = 1 / self.server.tokens_per_sec
+        for i, token in enumerate(tokens):
+            content = token if i == 0 else " " + token
+            self._chunk({"choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]})
+            time.sleep(delay)
+        if include_usage:
+            self._chunk({"choices": [], "usage": usage})
+        self._write(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, data):
+        data = {"id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": "fake", **data}
+        self._write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    def _write(self, payload: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+
+    def _send_error(self):
+        status, headers = random.choice(((429, {"Retry-After": "0.1"}), (500, {})))
+        payload = json.dumps({"error": {"message": "Injected failure", "type": "server_error"}}).encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, data):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server for MANOVAT benchmarks")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=100)
+    parser.add_argument("--completion-tokens", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 429/500")
+    args = parser.parse_args()
+    server = FakeOpenAI(args.port, args.latency, args.tokens_per_sec, args.completion_tokens,
+                        error_rate=args.error_rate)
+    print(f"Fake OpenAI listening on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
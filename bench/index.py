@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import resource
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from manovat.index import AnalysisIndex
+
+# Reuse index at scale, with synthetic vectors (no API calls): build time (one add per completed
+# session, as the app does, and in bulk), reopening the files, and query latency, checking that
+# a reworded query (the stored vector plus noise) finds its entry:
+#   python -m bench.index --entries 100000 --dimensions 256 --json index.json
+
+
+def percentile(values: List[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="MANOVAT reuse index build and query latency")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--incremental", type=int, default=2000, help="entries added one at a time before the bulk")
+    parser.add_argument("--entry-bytes", type=int, default=2000, help="size of each entry's solution text")
+    parser.add_argument("--noise", type=float, default=0.3, help="query noise relative to the vector norm")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--dir", help="where to write the index (default: a temporary directory)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.entries, args.dimensions), dtype=np.float32)
+    solution = ("- " + "model data pipeline " * 8 + "\n") * max(1, args.entry_bytes // 170)
+    path = os.path.join(args.dir or tempfile.mkdtemp(prefix="manovat-index-"), "index")
+    results: Dict[str, Any] = {"entries": args.entries, "dimensions": args.dimensions}
+
+    index = AnalysisIndex(path, "bench")
+    incremental = min(args.incremental, args.entries)
+    started = time.perf_counter()
+    for i in range(incremental):
+        index.add(vectors[i], {"id": str(i), "solution": solution})
+    seconds = time.perf_counter() - started
+    results["add_ms"] = seconds / max(1, incremental) * 1000
+    started = time.perf_counter()
+    for start in range(incremental, args.entries, 10000):
+        end = min(args.entries, start + 10000)
+        index.add_many(vectors[start:end], [{"id": str(i), "solution": solution} for i in range(start, end)])
+    results["bulk_seconds"] = time.perf_counter() - started
+    results["file_mb"] = sum(os.path.getsize(path + suffix) for suffix in (".f32", ".jsonl")) / 1e6
+    print(f"build: {results['add_ms']:.3f} ms per add ({incremental} entries), "
+          f"{results['bulk_seconds']:.2f}s for the other {args.entries - incremental} in bulk, "
+          f"{results['file_mb']:.0f} MB on disk")
+
+    del index
+    started = time.perf_counter()
+    index = AnalysisIndex(path, "bench")
+    results["load_seconds"] = time.perf_counter() - started
+    results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"load: {results['load_seconds']:.2f}s for {len(index)} entries, peak RSS {results['max_rss_mb']:.0f} MB")
+
+    targets = rng.integers(0, args.entries, args.queries)
+    scale = args.noise / np.sqrt(args.dimensions)
+    latencies, found, scores = [], 0, []
+    for target in targets:
+        query = vectors[target] / np.linalg.norm(vectors[target])
+        query = query + rng.standard_normal(args.dimensions, dtype=np.float32) * scale
+        started = time.perf_counter()
+        matches = index.search(query, args.threshold)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if matches:
+            scores.append(matches[0].score)
+            found += matches[0].entry["id"] == str(target)
+    results["query_ms"] = {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                           "p99": percentile(latencies, 99)}
+    results["recall"] = found / args.queries
+    miss = rng.standard_normal(args.dimensions, dtype=np.float32)
+    results["unrelated_matches"] = len(index.search(miss, args.threshold))
+    print(f"query: p50 {results['query_ms']['p50']:.2f} ms, p95 {results['query_ms']['p95']:.2f} ms, "
+          f"p99 {results['query_ms']['p99']:.2f} ms; {results['recall']:.1%} of reworded queries found their entry "
+          f"(median score {statistics.median(scores) if scores else 0:.3f}), "
+          f"{results['unrelated_matches']} matches for an unrelated one")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
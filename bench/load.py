@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from bench.fake_openai import FakeOpenAI
+from manovat import config
+
+# Replays scripted interviews through the Engine (WELCOME -> COMPLETE + PDF) against a
+# fake OpenAI server, at increasing concurrency:
+#   python -m bench.load --concurrency 1,8,32 --sessions 64 --latency 0.3 --tokens-per-sec 80
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is the peak (KiB on Linux, bytes on macOS), good enough without /proc
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RSSSampler:
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.baseline = self.peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __enter__(self) -> "RSSSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+def script(index: int) -> List[str]:
+    # Answers are unique per session so the response cache can't short-circuit the run
+    return [f"Session {index}: our support team can't keep up with ticket volume.",
+            f"Session {index}: cut first response time by 50%."] + \
+           [f"Session {index}, answer {n}." for n in range(40)]
+
+
+def run_session(engine, index: int, render_pdf: bool) -> Dict[str, Any]:
+    from manovat import report
+    from manovat.engine import Session
+    from manovat.llm import LLMError
+    session = Session()
+    answers = iter(script(index))
+    started = time.perf_counter()
+    try:
+        result = engine.step(session)
+        while not result.done:
+            result = engine.step(session, next(answers))
+    except LLMError:
+        return finish(session, started, False, report)
+    return finish(session, started, render_pdf, report)
+
+
+async def arun_session(engine, index: int, render_pdf: bool) -> Dict[str, Any]:
+    from manovat import report
+    from manovat.engine import Session
+    from manovat.llm import LLMError
+    session = Session()
+    answers = iter(script(index))
+    started = time.perf_counter()
+    try:
+        result = await engine.astep(session)
+        while not result.done:
+            result = await engine.astep(session, next(answers))
+    except LLMError:
+        render_pdf = False
+    return await asyncio.get_running_loop().run_in_executor(None, finish, session, started, render_pdf, report)
+
+
+def finish(session, started: float, render_pdf: bool, report) -> Dict[str, Any]:
+    from manovat import metrics
+    from manovat.engine import tokens_saved
+    seconds = time.perf_counter() - started
+    pdf_seconds = None
+    if render_pdf:
+        # render_pdf, not generate_pdf_report, so the memo never hides the rendering cost
+        pdf_started = time.perf_counter()
+        report.render_pdf(report.report_content(session.data))
+        pdf_seconds = time.perf_counter() - pdf_started
+    return {"seconds": seconds, "pdf_seconds": pdf_seconds, "failed": bool(session.data.error),
+            "stages": {stage: usage["seconds"] for stage, usage in session.data.usage.items()},
+            "errors": sum(usage["errors"] for usage in session.data.usage.values()),
+            "prompt_tokens": metrics.summary_totals(session.data.usage)["prompt_tokens"],
+            "tokens_saved": tokens_saved(session.data)}
+
+
+def run_level(engine, driver: str, concurrency: int, sessions: int, render_pdf: bool) -> Dict[str, Any]:
+    with RSSSampler() as rss:
+        started = time.perf_counter()
+        if driver == "async":
+            async def main():
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def bounded(index):
+                    async with semaphore:
+                        return await arun_session(engine, index, render_pdf)
+                return await asyncio.gather(*(bounded(i) for i in range(sessions)))
+            results = asyncio.run(main())
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(lambda i: run_session(engine, i, render_pdf), range(sessions)))
+        elapsed = time.perf_counter() - started
+    stages: Dict[str, List[float]] = {}
+    for result in results:
+        for stage, seconds in result["stages"].items():
+            stages.setdefault(stage, []).append(seconds)
+    session_seconds = [result["seconds"] for result in results if not result["failed"]]
+    failed = sum(result["failed"] for result in results)
+    pdf_seconds = [result["pdf_seconds"] for result in results if result["pdf_seconds"] is not None]
+    return {
+        "concurrency": concurrency, "sessions": sessions, "elapsed": elapsed,
+        "sessions_per_sec": (sessions - failed) / elapsed,
+        "session_p50": percentile(session_seconds, 50), "session_p95": percentile(session_seconds, 95),
+        "pdf_p50": percentile(pdf_seconds, 50), "pdf_p95": percentile(pdf_seconds, 95),
+        "peak_rss_per_session_mb": (rss.peak - rss.baseline) / min(concurrency, sessions) / 2 ** 20,
+        "errors": sum(result["errors"] for result in results),
+        "failed_sessions": failed,
+        "prompt_tokens_per_session": sum(result["prompt_tokens"] for result in results) / sessions,
+        "tokens_saved_per_session": sum(result["tokens_saved"] for result in results) / sessions,
+        "stages": {stage: {"p50": percentile(values, 50), "p95": percentile(values, 95),
+                           "p99": percentile(values, 99)} for stage, values in sorted(stages.items())}
+    }
+
+
+def print_level(level: Dict[str, Any]):
+    print(f"\nconcurrency {level['concurrency']}: {level['sessions']} sessions in {level['elapsed']:.2f}s, "
+          f"{level['sessions_per_sec']:.2f} sessions/s, {level['failed_sessions']} failed sessions, "
+          f"{level['errors']} failed calls")
+    print(f"  session  p50 {level['session_p50']:.3f}s  p95 {level['session_p95']:.3f}s")
+    print(f"  pdf      p50 {level['pdf_p50'] * 1000:.1f}ms  p95 {level['pdf_p95'] * 1000:.1f}ms")
+    print(f"  peak RSS {level['peak_rss_per_session_mb']:.2f} MB/session")
+    print(f"  prompt tokens {level['prompt_tokens_per_session']:.0f}/session, "
+          f"{level['tokens_saved_per_session']:.0f} saved/session")
+    print(f"  {'stage':<24}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for stage, values in level["stages"].items():
+        print(f"  {stage:<24}{values['p50']:>8.3f}s{values['p95']:>8.3f}s{values['p99']:>8.3f}s")
+
+
+def spawn_fake_server(args):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen([
+        sys.executable, "-m", "bench.fake_openai", "--port", str(port), "--latency", str(args.latency),
+        "--tokens-per-sec", str(args.tokens_per_sec), "--completion-tokens", str(args.completion_tokens),
+        "--error-rate", str(args.error_rate)
+    ], stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError("fake OpenAI server did not start")
+            time.sleep(0.05)
+    return process, f"http://127.0.0.1:{port}/v1"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="MANOVAT load test against a fake OpenAI server")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma separated concurrency levels")
+    parser.add_argument("--sessions", type=int, default=0, help="sessions per level (default: 4x concurrency)")
+    parser.add_argument("--driver", choices=("thread", "async"), default="thread",
+                        help="thread: Engine.step as in the Streamlit app; async: Engine.astep as in the API")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake server time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=100)
+    parser.add_argument("--completion-tokens", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake requests failing with 429/500")
+    parser.add_argument("--base-url", help="use this server instead of starting a fake one")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run the fake server on a thread of this process (shares the GIL with the app)")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--no-pdf", action="store_true")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    fake = process = None
+    if args.base_url:
+        config.OPENAI_BASE_URL = args.base_url
+    elif args.in_process:
+        fake = FakeOpenAI(0, args.latency, args.tokens_per_sec, args.completion_tokens,
+                          error_rate=args.error_rate).start()
+        config.OPENAI_BASE_URL = fake.base_url
+    else:
+        process, config.OPENAI_BASE_URL = spawn_fake_server(args)
+    if not args.cache:
+        config.CACHE_PATH = ""
+    from manovat.engine import Engine
+    engine = Engine(config.OPENAI_API_KEY or "benchmark")
+
+    # Warm-up: imports, clients, PDF styles and fonts shouldn't count against the first level
+    run_level(engine, args.driver, 1, 1, not args.no_pdf)
+    levels = []
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        level = run_level(engine, args.driver, concurrency, args.sessions or 4 * concurrency, not args.no_pdf)
+        print_level(level)
+        levels.append(level)
+    if fake is not None:
+        print(f"\nfake server handled {fake.requests} requests")
+        fake.shutdown()
+    if process is not None:
+        process.terminate()
+        process.wait()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "levels": levels}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
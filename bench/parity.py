@@ -0,0 +1,116 @@
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from manovat import config
+
+# Compares the structured classification (one JSON-schema call) with the y/n prompts it
+# replaces, on the same solutions, against the configured OpenAI endpoint:
+#   python -m bench.parity                      # built-in cases
+#   python -m bench.parity intake.jsonl --json parity.json
+# Input rows use the manovat.batch columns; a 'solution' column skips generating the solution.
+
+CASES = [
+    {"id": "photographer", "problem_statement": "I'm a freelance wedding photographer and spend two days per "
+                                                "wedding picking and tagging the best shots.",
+     "success_criteria": "Cut culling time to half a day.",
+     "dataset_available": "About 400,000 past photos, 10% marked as delivered to clients."},
+    {"id": "steel-cranes", "problem_statement": "Overhead crane operators in our steel mill have near misses with "
+                                                "ground staff during coil handling.",
+     "success_criteria": "Halve near misses within a year."},
+    {"id": "retail-forecast", "problem_statement": "Our 120 grocery stores over-order fresh produce and throw away "
+                                                   "8% of it.",
+     "success_criteria": "Reduce waste to 4% without more stock-outs.",
+     "dataset_available": "Three years of daily sales and deliveries per store and product.",
+     "dataset_quality": "Complete, a few weeks missing in 2021."},
+    {"id": "bakery-orders", "problem_statement": "I run a bakery on my own and miss custom cake orders sent by "
+                                                 "WhatsApp and email.",
+     "success_criteria": "No missed orders."},
+    {"id": "er-triage", "problem_statement": "Emergency department triage nurses are overwhelmed at night and "
+                                             "critical patients wait too long.",
+     "success_criteria": "Critical patients seen within 10 minutes.",
+     "dataset_available": "200 handwritten triage forms."},
+    {"id": "contracts", "problem_statement": "Our legal team of 30 spends most of its time reviewing supplier "
+                                             "contracts for non-standard clauses.",
+     "success_criteria": "Review time per contract under 30 minutes."},
+]
+
+
+def dataset_info(row: Dict[str, str]) -> Dict[str, str]:
+    from manovat.batch import QUESTION_FIELDS
+    from manovat.engine import get_dataset_questions
+    return {question: row[QUESTION_FIELDS[question]] for question in get_dataset_questions()
+            if row.get(QUESTION_FIELDS[question])}
+
+
+def compare(engine, row: Dict[str, str]) -> Dict[str, Any]:
+    from manovat import engine as flow, metrics
+    solution = row.get("solution") or engine.complete(
+        flow.analyze_problem_and_solution(row.get("problem_statement", ""), row.get("success_criteria", "")))
+    dataset = dataset_info(row)
+    prompts = {key: check(solution) for key, check in flow.SOLUTION_CHECKS.items()}
+    structured = [flow.classify_solution(solution)]
+    if dataset:
+        prompts["dataset_sufficient"] = flow.check_dataset_sufficiency(solution, dataset)
+        structured.append(flow.classify_dataset(solution, dataset))
+
+    usage: Dict[str, Dict[str, Dict[str, float]]] = {"prompts": {}, "structured": {}}
+    started = time.perf_counter()
+    individual = {key: flow.is_yes(engine.complete(prompt, usage["prompts"])) for key, prompt in prompts.items()}
+    prompts_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    combined: Dict[str, Optional[bool]] = {}
+    for prompt in structured:
+        questions = flow.SOLUTION_QUESTIONS if prompt.stage == "solution_checks" else flow.DATASET_QUESTIONS
+        answers = flow.parse_classification(engine.complete(prompt, usage["structured"]), questions)
+        combined.update(answers or dict.fromkeys(questions))
+    structured_seconds = time.perf_counter() - started
+    return {
+        "id": row["id"], "prompts": individual, "structured": combined,
+        "mismatches": [key for key in individual if individual[key] != combined.get(key)],
+        "cost": {mode: {**metrics.summary_totals(usage[mode]), "seconds": round(seconds, 3)}
+                 for mode, seconds in (("prompts", prompts_seconds), ("structured", structured_seconds))}
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Structured classification vs y/n prompts parity check")
+    parser.add_argument("input", nargs="?", help="CSV or JSONL in the manovat.batch format (default: built-in cases)")
+    parser.add_argument("--min-agreement", type=float, default=1.0, help="exit 1 below this fraction of answers")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    if not config.OPENAI_API_KEY:
+        parser.error("OPENAI_API_KEY is not set")
+    if not args.cache:
+        config.CACHE_PATH = ""
+    from manovat.batch import read_rows
+    from manovat.engine import Engine
+    engine = Engine(config.OPENAI_API_KEY)
+    rows = list(read_rows(args.input)) if args.input else CASES
+
+    results = []
+    for row in rows:
+        result = compare(engine, row)
+        results.append(result)
+        status = "ok" if not result["mismatches"] else "MISMATCH " + ", ".join(result["mismatches"])
+        print(f"{result['id']:<20} {status}  prompts={result['prompts']}  structured={result['structured']}")
+
+    answers = sum(len(result["prompts"]) for result in results)
+    agreement = 1 - sum(len(result["mismatches"]) for result in results) / max(1, answers)
+    print(f"\n{agreement:.1%} agreement on {answers} answers over {len(results)} solutions")
+    for mode in ("prompts", "structured"):
+        totals = {name: sum(result["cost"][mode][name] for result in results)
+                  for name in ("calls", "prompt_tokens", "completion_tokens", "seconds")}
+        print(f"  {mode:<11}{totals['calls']:>5g} calls {totals['prompt_tokens']:>8g} prompt + "
+              f"{totals['completion_tokens']:>6g} completion tokens {totals['seconds']:>8.2f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"agreement": agreement, "results": results}, f, indent=2)
+    return 0 if agreement >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
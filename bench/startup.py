@@ -0,0 +1,61 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+# Cold start: import time of each entry point in a fresh interpreter, which heavy dependencies
+# it pulls in, and the Streamlit script's first run vs a rerun (through streamlit's AppTest):
+#   python -m bench.startup --repeat 5
+
+MODULES = ("manovat.engine", "manovat.sessions", "manovat.report", "manovat.ui", "manovat.server", "manovat.batch")
+HEAVY = ("openai", "pydantic", "httpx", "reportlab", "streamlit", "starlette", "tiktoken")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - started,
+                  "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+APP_SCRIPT = """
+import json, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=60)
+app.session_state["authenticated"] = True
+runs = []
+for _ in range(3):
+    started = time.perf_counter()
+    app.run()
+    runs.append(time.perf_counter() - started)
+print(json.dumps({"runs": runs}))
+"""
+
+
+def run(script: str) -> Dict[str, Any]:
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="MANOVAT cold start: import and first-run times")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--no-app", action="store_true", help="skip the Streamlit script runs")
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<20}{'import p50':>12}  heavy dependencies loaded")
+    for module in MODULES:
+        results = [run(IMPORT_SCRIPT.format(module=module, heavy=HEAVY)) for _ in range(args.repeat)]
+        seconds = statistics.median(result["seconds"] for result in results)
+        print(f"{module:<20}{seconds * 1000:>10.0f}ms  {', '.join(results[0]['loaded']) or '-'}")
+    if not args.no_app:
+        results = [run(APP_SCRIPT) for _ in range(args.repeat)]
+        first, rerun = (statistics.median(result["runs"][i] for result in results) for i in (0, 2))
+        print(f"\napp.py first run {first * 1000:.0f}ms, rerun {rerun * 1000:.0f}ms (p50 over {args.repeat}; "
+              f"streamlit itself is imported by the test harness)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import hashlib
+import hmac
+import time
+from typing import Optional
+
+from manovat import config
+
+# Login tokens are "<expiry>.<signature>", signed with MANOVAT_AUTH_SECRET (the access code when
+# unset): any replica can check one without shared state, and changing the access code revokes them
+
+
+def check_code(code: Optional[str]) -> bool:
+    return bool(code) and hmac.compare_digest(code.encode("utf-8"), config.ACCESS_CODE.encode("utf-8"))
+
+
+def issue_token(ttl: float = config.AUTH_TTL) -> str:
+    expires = int(time.time() + ttl)
+    return f"{expires}.{_sign(expires)}"
+
+
+def verify_token(token: Optional[str]) -> bool:
+    expires, _, signature = (token or "").partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _sign(int(expires)))
+
+
+def _sign(expires: int) -> str:
+    secret = (config.AUTH_SECRET or config.ACCESS_CODE).encode("utf-8")
+    return hmac.new(secret, f"{expires}:{config.ACCESS_CODE}".encode("utf-8"), hashlib.sha256).hexdigest()
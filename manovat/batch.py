@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import csv
+import dataclasses
+import json
+import logging
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from manovat import config, metrics, report
+from manovat.engine import (ConversationState, Engine, Session, get_dataset_questions, get_human_factors_questions,
+                            tokens_saved)
+from manovat.ratelimit import RateLimiter
+from manovat.sessions import SQLiteSessionStore
+
+# Generates MANOVAT reports for a CSV or JSONL file of intake forms, one row per interview:
+#   python -m manovat.batch intake.csv --out reports/ --concurrency 8 --rpm 500 --tpm 200000
+# Each finished row writes <id>.pdf and <id>.json; rerunning the same command skips them and
+# resumes unfinished interviews from their last checkpoint.
+
+logger = logging.getLogger(__name__)
+
+DATASET_FIELDS = ('dataset_available', 'dataset_size', 'dataset_structure', 'dataset_consistency',
+                  'dataset_owner', 'dataset_quality')
+HUMAN_FACTORS_FIELDS = ('hf_current_solution', 'hf_teams', 'hf_collaboration', 'hf_procedures', 'hf_information',
+                        'hf_tools', 'hf_competencies', 'hf_training', 'hf_workplace', 'hf_workstations',
+                        'hf_task_division', 'hf_shifts')
+# Question text -> input column; the short human factors list reuses questions of the detailed one
+QUESTION_FIELDS = {
+    **dict(zip(get_dataset_questions(), DATASET_FIELDS)),
+    **dict(zip(get_human_factors_questions(True), HUMAN_FACTORS_FIELDS))
+}
+INPUT_FIELDS = ('id', 'problem_statement', 'success_criteria', *DATASET_FIELDS, *HUMAN_FACTORS_FIELDS, 'timeline')
+MISSING_ANSWER = "Not provided."
+
+
+def read_rows(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for number, row in enumerate(rows, 1):
+            row = {key: str(value).strip() for key, value in row.items() if key and value is not None}
+            row['id'] = safe_id(row.get('id') or str(number))
+            yield row
+
+
+def safe_id(value: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', value).strip('._') or 'row'
+
+
+def answer_for(session: Session, row: Dict[str, str]) -> str:
+    # The answer to the question the session is waiting on
+    state = session.state
+    data = session.data
+    if state == ConversationState.WELCOME:
+        field = 'problem_statement'
+    elif state == ConversationState.SUCCESS_CRITERIA:
+        field = 'success_criteria'
+    elif state == ConversationState.SMALL_BIZ_QUESTION:
+        field = 'hf_teams'
+    elif state == ConversationState.DATASET_QUESTIONS:
+        field = QUESTION_FIELDS[get_dataset_questions()[data.current_dataset_question]]
+    elif state == ConversationState.HUMAN_FACTORS_QUESTIONS:
+        field = QUESTION_FIELDS[get_human_factors_questions(data.human_factors_detailed)[data.current_hf_question]]
+    elif state == ConversationState.TIMELINE:
+        field = 'timeline'
+    else:
+        raise ValueError(f"Session is not waiting for an answer in state {state}")
+    return row.get(field) or MISSING_ANSWER
+
+
+def write_atomic(path: str, payload: bytes):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+class BatchRunner:
+    def __init__(self, out_dir: str, engine: Engine, store: SQLiteSessionStore, concurrency: int = 4,
+                 pdf: bool = True):
+        self.out_dir = out_dir
+        self.engine = engine
+        self.store = store
+        self.concurrency = concurrency
+        self.pdf = pdf
+        self.manifest_path = os.path.join(out_dir, 'manifest.jsonl')
+
+    def done(self, row_id: str) -> bool:
+        # The JSON is written last, so its presence means the row is finished
+        return os.path.exists(os.path.join(self.out_dir, f"{row_id}.json"))
+
+    async def run(self, rows: List[Dict[str, str]]) -> Dict[str, int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        counts = {'done': 0, 'skipped': 0, 'failed': 0}
+
+        async def bounded(row: Dict[str, str]):
+            if self.done(row['id']):
+                counts['skipped'] += 1
+                return
+            async with semaphore:
+                status = await self.run_row(row)
+            counts[status] += 1
+
+        await asyncio.gather(*(bounded(row) for row in rows))
+        return counts
+
+    async def run_row(self, row: Dict[str, str]) -> str:
+        started = time.perf_counter()
+        session_id = f"batch-{row['id']}"
+        session = self.store.get(session_id)
+        resumed = session is not None
+        if session is None:
+            session = Session(session_id)
+        try:
+            # For a resumed session this also retries the step that failed last time
+            result = await self.engine.astep(session)
+            while not result.done:
+                result = await self.engine.astep(session, answer_for(session, row))
+            if self.pdf:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, report.write_pdf_atomic, report.report_content(session.data),
+                    os.path.join(self.out_dir, f"{row['id']}.pdf"))
+            payload = {'id': row['id'], **dataclasses.asdict(session.data)}
+            write_atomic(os.path.join(self.out_dir, f"{row['id']}.json"),
+                         json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'))
+        except Exception as e:
+            # The session keeps its last checkpoint, so the next run resumes the row from there
+            logger.error("Row %s failed: %s", row['id'], e)
+            self.log(row['id'], 'failed', started, session, str(e))
+            return 'failed'
+        self.store.delete(session_id)
+        self.log(row['id'], 'done', started, session, resumed=resumed)
+        return 'done'
+
+    def log(self, row_id: str, status: str, started: float, session: Session, error: Optional[str] = None,
+            resumed: bool = False):
+        totals = metrics.summary_totals(session.data.usage)
+        entry: Dict[str, Any] = {
+            'id': row_id, 'status': status, 'seconds': round(time.perf_counter() - started, 3),
+            'resumed': resumed, 'tokens': totals['prompt_tokens'] + totals['completion_tokens'],
+            'tokens_saved': tokens_saved(session.data), 'calls': totals['calls']
+        }
+        if error:
+            entry['error'] = error
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        print(f"[{status}] {row_id} in {entry['seconds']:.1f}s, {entry['tokens']:g} tokens", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate MANOVAT reports for a CSV/JSONL of intake forms")
+    parser.add_argument('input', help="CSV or JSONL; columns: " + ", ".join(INPUT_FIELDS))
+    parser.add_argument('--out', default='reports', help="output directory for <id>.pdf/<id>.json")
+    parser.add_argument('--concurrency', type=int, default=4, help="interviews running at once")
+    parser.add_argument('--rpm', type=float, default=config.OPENAI_RPM, help="requests per minute (0 = unlimited)")
+    parser.add_argument('--tpm', type=float, default=config.OPENAI_TPM, help="tokens per minute (0 = unlimited)")
+    parser.add_argument('--no-pdf', action='store_true', help="only write the JSON results")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    if not config.OPENAI_API_KEY:
+        parser.error("OPENAI_API_KEY is not set")
+    os.makedirs(args.out, exist_ok=True)
+    rows = list(read_rows(args.input))
+    if len({row['id'] for row in rows}) != len(rows):
+        parser.error("row ids must be unique")
+    # Unfinished interviews are checkpointed here after each state transition
+    store = SQLiteSessionStore(os.path.join(args.out, 'sessions.sqlite3'), ttl=30 * 24 * 3600)
+    engine = Engine(config.OPENAI_API_KEY, checkpoint=store.save, limiter=RateLimiter(args.rpm, args.tpm))
+    runner = BatchRunner(args.out, engine, store, args.concurrency, not args.no_pdf)
+    started = time.perf_counter()
+    counts = asyncio.run(runner.run(rows))
+    print(f"{counts['done']} done, {counts['skipped']} already done, {counts['failed']} failed "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from manovat import config, shared
+
+
+class ResponseCache:
+    # SQLite-backed LLM response cache with TTL expiry and LRU eviction
+    def __init__(self, path: str, ttl: float = 0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_message: str, temperature: float, max_tokens: int,
+                 response_format: Optional[Dict[str, Any]] = None, base_url: Optional[str] = None) -> str:
+        # The endpoint is part of the key: answers from a fake or local server never reach the real one
+        parts: List[Any] = [base_url or "", model, system_prompt, user_message, temperature, max_tokens]
+        if response_format is not None:
+            parts.append(response_format)
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, now, now))
+            if self.ttl:
+                self.evictions += self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+                ).rowcount
+            excess = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.evictions += self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (excess,)
+                ).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": entries}
+
+
+class RedisResponseCache:
+    # Same interface as ResponseCache, shared by every replica: entries expire after ttl, and a
+    # sorted set of last access times drops the least recently used beyond max_entries.
+    # hits/misses/evictions count this process only.
+    make_key = staticmethod(ResponseCache.make_key)
+
+    def __init__(self, client, ttl: float = 0, max_entries: int = 10000, prefix: str = "manovat:cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lru = prefix + "lru"
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self.client.zadd(self._lru, {key: time.time()})
+        return value.decode("utf-8")
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, value.encode("utf-8"), ex=int(self.ttl) or None)
+        pipe.zadd(self._lru, {key: now})
+        if self.ttl:
+            # Not read for ttl seconds means already expired in Redis
+            pipe.zremrangebyscore(self._lru, 0, now - self.ttl)
+        pipe.zcard(self._lru)
+        excess = pipe.execute()[-1] - self.max_entries
+        if excess > 0:
+            evicted = [member.decode("utf-8") for member, _ in self.client.zpopmin(self._lru, excess)]
+            self.client.delete(*(self.prefix + member for member in evicted))
+            with self._lock:
+                self.evictions += len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": self.client.zcard(self._lru)}
+
+
+Cache = Union[ResponseCache, RedisResponseCache]
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[Cache]:
+    global _cache
+    if _cache is None and config.CACHE_PATH:
+        with _cache_lock:
+            if _cache is None:
+                client = shared.get_redis()
+                if client is not None:
+                    _cache = RedisResponseCache(client, config.CACHE_TTL, config.CACHE_MAX_ENTRIES)
+                else:
+                    _cache = ResponseCache(config.CACHE_PATH, config.CACHE_TTL, config.CACHE_MAX_ENTRIES)
+    return _cache
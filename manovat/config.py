@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+# OpenAI
+OPENAI_MODEL = os.environ.get("MANOVAT_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL") or None
+OPENAI_TIMEOUT = float(os.environ.get("MANOVAT_OPENAI_TIMEOUT", "60"))
+OPENAI_CLASSIFIER_TIMEOUT = float(os.environ.get("MANOVAT_OPENAI_CLASSIFIER_TIMEOUT", "20"))
+OPENAI_MAX_RETRIES = int(os.environ.get("MANOVAT_OPENAI_MAX_RETRIES", "3"))
+# Jittered exponential backoff between retries (base * 2^attempt, capped)
+OPENAI_RETRY_BASE = float(os.environ.get("MANOVAT_OPENAI_RETRY_BASE", "0.5"))
+OPENAI_RETRY_MAX = float(os.environ.get("MANOVAT_OPENAI_RETRY_MAX", "20"))
+# Circuit breaker: consecutive failed calls before failing fast, and for how long
+BREAKER_THRESHOLD = int(os.environ.get("MANOVAT_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.environ.get("MANOVAT_BREAKER_RESET", "30"))
+LLM_WORKERS = int(os.environ.get("MANOVAT_LLM_WORKERS", "16"))
+# Account rate limits shared by every call in the process (0 = unlimited)
+OPENAI_RPM = float(os.environ.get("MANOVAT_OPENAI_RPM", "0"))
+OPENAI_TPM = float(os.environ.get("MANOVAT_OPENAI_TPM", "0"))
+
+# Prompt budgets: input tokens of each call's user message (classifiers get a smaller one),
+# and the length of the solution summary that later stages receive instead of the full solution
+PROMPT_TOKEN_BUDGET = int(os.environ.get("MANOVAT_PROMPT_TOKEN_BUDGET", "1500"))
+CLASSIFIER_TOKEN_BUDGET = int(os.environ.get("MANOVAT_CLASSIFIER_TOKEN_BUDGET", "800"))
+SUMMARY_MAX_TOKENS = int(os.environ.get("MANOVAT_SUMMARY_MAX_TOKENS", "300"))
+# Yes/no checks as one JSON-schema call (0: one prompt per question, for endpoints without structured outputs)
+STRUCTURED_CHECKS = os.environ.get("MANOVAT_STRUCTURED_CHECKS", "1") == "1"
+
+# Reuse of prior analyses (empty path disables it): completed sessions' problems are embedded into
+# a local index, and a new problem at least REUSE_THRESHOLD cosine-similar to one of them takes
+# over its solution instead of generating one
+REUSE_INDEX = os.environ.get("MANOVAT_REUSE_INDEX", "")
+REUSE_THRESHOLD = float(os.environ.get("MANOVAT_REUSE_THRESHOLD", "0.9"))
+EMBEDDING_MODEL = os.environ.get("MANOVAT_EMBEDDING_MODEL", "text-embedding-3-small")
+# 0 keeps the model's own size (text-embedding-3 models can be shortened, older ones can't)
+EMBEDDING_DIMENSIONS = int(os.environ.get("MANOVAT_EMBEDDING_DIMENSIONS", "256"))
+
+# Connection pool
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("MANOVAT_OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE = int(os.environ.get("MANOVAT_OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get("MANOVAT_OPENAI_KEEPALIVE_EXPIRY", "60"))
+
+# Response cache (empty path disables it; with REDIS_URL set it lives in Redis instead of this file);
+# only calls at or below CACHE_MAX_TEMPERATURE are cached
+CACHE_PATH = os.environ.get("MANOVAT_CACHE_PATH", ".manovat_cache.sqlite3")
+CACHE_TTL = float(os.environ.get("MANOVAT_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.environ.get("MANOVAT_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_TEMPERATURE = float(os.environ.get("MANOVAT_CACHE_MAX_TEMPERATURE", "0.2"))
+
+# UI
+COSMETIC_DELAY = float(os.environ.get("MANOVAT_COSMETIC_DELAY", "0"))
+
+# PDF report
+# Rendered reports are files shared by every process pointing at the same directory;
+# PDF_CACHE_SIZE caps how many are kept, REPORT_TTL drops the ones not downloaded for that long
+REPORT_DIR = os.environ.get("MANOVAT_REPORT_DIR", os.path.join(tempfile.gettempdir(), "manovat-reports"))
+PDF_CACHE_SIZE = int(os.environ.get("MANOVAT_PDF_CACHE_SIZE", "256"))
+REPORT_TTL = float(os.environ.get("MANOVAT_REPORT_TTL", str(24 * 3600)))
+
+# Shared backend for several replicas behind a load balancer (redis://host:port/db): sessions,
+# response cache and RPM/TPM buckets move there, so any replica can serve any step of a session
+REDIS_URL = os.environ.get("MANOVAT_REDIS_URL", "")
+
+# Access and sessions
+ACCESS_CODE = os.environ.get("MANOVAT_ACCESS_CODE", "demo_2025")
+# Key for the login tokens that let the UI skip the access code on any replica (default: the access code)
+AUTH_SECRET = os.environ.get("MANOVAT_AUTH_SECRET", "")
+AUTH_TTL = float(os.environ.get("MANOVAT_AUTH_TTL", str(12 * 3600)))
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+SESSION_TTL = float(os.environ.get("MANOVAT_SESSION_TTL", str(2 * 3600)))
+# memory:// (per process), sqlite:///path/to/sessions.db or redis://host:port/db
+SESSION_STORE = os.environ.get("MANOVAT_SESSION_STORE", REDIS_URL or "memory://")
+# Upper bound on one step holding a session (a stuck lock is released after this many seconds)
+SESSION_LOCK_TTL = float(os.environ.get("MANOVAT_SESSION_LOCK_TTL", "600"))
+
+# Metrics: Prometheus text on this port for the Streamlit app (0 disables; the API serves /metrics itself)
+METRICS_PORT = int(os.environ.get("MANOVAT_METRICS_PORT", "0"))
@@ -0,0 +1,915 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import (Any, AsyncIterator, Awaitable, Callable, Collection, Dict, Generator, Iterator, List, NamedTuple,
+                    Optional, Union)
+
+from manovat import config, llm, metrics, tokens
+from manovat.index import REUSE_FIELDS, AnalysisIndex, Match, get_index
+from manovat.messages import Message, MessageStore
+from manovat.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+# Stati
+class ConversationState:
+    WELCOME = "welcome"
+    PROBLEM_UNDERSTANDING = "problem_understanding"
+    SUCCESS_CRITERIA = "success_criteria"
+    ANALYZING_SOLUTION = "analyzing_solution"
+    SMALL_BIZ_CHECK = "small_biz_check"
+    SMALL_BIZ_QUESTION = "small_biz_question"
+    DATASET_CHECK = "dataset_check"
+    DATASET_QUESTIONS = "dataset_questions"
+    DATASET_SUFFICIENCY_CHECK = "dataset_sufficiency_check"
+    TECH_ANALYSIS = "tech_analysis"
+    HUMAN_FACTORS_CHECK = "human_factors_check"
+    HUMAN_FACTORS_QUESTIONS = "human_factors_questions"
+    TIMELINE = "timeline"
+    COMPLETE = "complete"
+
+
+PROGRESS = {
+    ConversationState.WELCOME: 0, ConversationState.PROBLEM_UNDERSTANDING: 10,
+    ConversationState.SUCCESS_CRITERIA: 20, ConversationState.ANALYZING_SOLUTION: 25,
+    ConversationState.SMALL_BIZ_CHECK: 30, ConversationState.SMALL_BIZ_QUESTION: 40,
+    ConversationState.DATASET_CHECK: 45, ConversationState.DATASET_QUESTIONS: 55,
+    ConversationState.DATASET_SUFFICIENCY_CHECK: 60, ConversationState.TECH_ANALYSIS: 70,
+    ConversationState.HUMAN_FACTORS_CHECK: 75, ConversationState.HUMAN_FACTORS_QUESTIONS: 85,
+    ConversationState.TIMELINE: 95, ConversationState.COMPLETE: 100
+}
+
+PLACEHOLDERS = {
+    ConversationState.WELCOME: "Describe your business problem...",
+    ConversationState.SUCCESS_CRITERIA: "Describe your success criteria...",
+    ConversationState.TIMELINE: "Describe your timeline..."
+}
+
+# States that can stop to ask the user something; every other state runs on without input
+INPUT_STATES = frozenset((
+    ConversationState.WELCOME, ConversationState.SUCCESS_CRITERIA, ConversationState.SMALL_BIZ_QUESTION,
+    ConversationState.DATASET_QUESTIONS, ConversationState.HUMAN_FACTORS_QUESTIONS, ConversationState.TIMELINE
+))
+
+WELCOME_MESSAGE = """Welcome to MANOVAT!
+
+I'll guide you through designing a comprehensive AI/ML solution.
+
+Let's begin! **What is your specific business problem?**"""
+
+
+class Prompt(NamedTuple):
+    stage: str
+    system_prompt: str
+    user_message: str
+    temperature: float = 0.5
+    max_tokens: int = 1024
+    stream: bool = False
+    timeout: Optional[float] = None
+    # Input tokens the budget and the solution summary cut from this prompt
+    tokens_saved: int = 0
+    # Structured output (JSON schema) requested from the API
+    response_format: Optional[Dict[str, Any]] = None
+    # A failed call answers '' instead of failing the step; the flow has a fallback for it
+    optional: bool = False
+
+
+class Background(NamedTuple):
+    # Asks the driver to start a prompt now; yielding the same stage later collects it
+    prompt: Prompt
+    # Collected by a later step, which may run in another process
+    across_steps: bool = False
+
+
+class Lookup(NamedTuple):
+    # Asks the driver for a completed analysis of a near-identical problem: an index.Match, or
+    # None (no reuse index, nothing similar enough, or the lookup failed)
+    text: str
+
+
+class Remember(NamedTuple):
+    # Asks the driver to add a completed analysis to the reuse index, if there is one. text is
+    # only embedded when the session's Lookup left no vector
+    text: str
+    entry: Dict[str, Any]
+
+
+Effect = Union[Prompt, List[Prompt], Background, Lookup, Remember]
+
+
+@dataclass(slots=True)
+class SessionData:
+    problem_statement: str = ''
+    success_criteria: str = ''
+    solution: str = ''
+    # Compact version of the solution sent to every later stage
+    solution_summary: str = ''
+    is_small_biz: bool = False
+    dataset_needed: bool = False
+    dataset_sufficient: bool = False
+    dataset_info: Dict[str, str] = field(default_factory=dict)
+    tech_requirements: str = ''
+    human_factors_detailed: bool = False
+    human_factors_info: Dict[str, str] = field(default_factory=dict)
+    human_factors_analysis: str = ''
+    planned_timeline: str = ''
+    timeline: str = ''
+    current_dataset_question: int = 0
+    current_hf_question: int = 0
+    total_questions_asked: int = 0
+    solution_checks: Dict[str, bool] = field(default_factory=dict)
+    question_asked: bool = False
+    completed_at: str = ''
+    # Session whose solution was reused from the reuse index, if any
+    reused_from: str = ''
+    # Embedding of the Lookup that found nothing to reuse, added to the index on completion
+    reuse_vector: List[float] = field(default_factory=list)
+    # Why the last step failed; cleared once a retry gets through
+    error: str = ''
+    # Per-stage LLM usage for this session: calls, seconds, tokens, cache hits, retries, errors
+    usage: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+class Session:
+    __slots__ = ('id', 'state', 'messages', 'data', 'pending')
+
+    def __init__(self, id: Optional[str] = None, state: str = ConversationState.WELCOME,
+                 messages: Optional[MessageStore] = None, data: Optional[SessionData] = None):
+        self.id = id or uuid.uuid4().hex
+        self.state = state
+        self.messages = messages if messages is not None else MessageStore()
+        self.data = data if data is not None else SessionData()
+        # Background calls in flight, keyed by prompt stage; never persisted
+        self.pending: Dict[str, Any] = {}
+
+
+class StepResult(NamedTuple):
+    state: str
+    messages: List[Message]
+    placeholder: Optional[str]
+    # Set when the last step failed and has to be retried
+    error: str = ''
+
+    @property
+    def done(self) -> bool:
+        return self.state == ConversationState.COMPLETE
+
+
+# Prompt builders: each returns the Prompt for one LLM call, the Engine runs it
+def analyze_problem_and_solution(problem_statement: str, success_criteria: str) -> Prompt:
+    system_prompt = """You are an AI Solutions Consultant with deep expertise in business strategy and AI/ML technologies.
+
+Output Requirements:
+1. Business Challenge Summary - Restate the user's problem
+2. Artificial Intelligence Driven Solution - Suggest AI solution with DL/ML specifics
+   Subtitle: How it Works - Explain operation details
+3. Success Metrics and Targets - Propose metrics and targets
+4. Assumptions - State any assumptions
+
+Use clear sections with bullet points. Be professional and concise. Only answer if certain. Avoid generic statements."""
+
+    user_message, saved = tokens.fit([("Business Problem", problem_statement),
+                                      ("Success Criteria", success_criteria)], config.PROMPT_TOKEN_BUDGET)
+    return Prompt('solution', system_prompt, user_message, 0.5, 1024, stream=True, tokens_saved=saved)
+
+
+def restate_problem(problem_statement: str, success_criteria: str) -> Prompt:
+    # Section 1 of analyze_problem_and_solution's output, for a solution reused from another problem
+    system_prompt = """You are an AI Solutions Consultant with deep expertise in business strategy and AI/ML technologies.
+
+Write only the first section of a solution report: start with the line "### 1. Business Challenge Summary", then restate the user's problem and success criteria.
+
+Use bullet points. Be professional and concise. Only answer if certain. Avoid generic statements."""
+
+    user_message, saved = tokens.fit([("Business Problem", problem_statement),
+                                      ("Success Criteria", success_criteria)], config.PROMPT_TOKEN_BUDGET)
+    return Prompt('challenge_summary', system_prompt, user_message, 0.5, 256, tokens_saved=saved)
+
+
+# Where the solution proper starts, after section 1 (the restated problem)
+_SOLUTION_SECTION = re.compile(r"^.*Artificial Intelligence Driven Solution", re.IGNORECASE | re.MULTILINE)
+
+
+def reused_solution(solution: str) -> Optional[str]:
+    # A stored solution without its Business Challenge Summary, which restates someone else's
+    # problem; None when the section can't be found
+    match = _SOLUTION_SECTION.search(solution)
+    return solution[match.start():] if match is not None and match.start() > 0 else None
+
+
+def reuse_query(problem_statement: str, success_criteria: str) -> str:
+    # The text embedded for the reuse index, both to look up a new problem and to add a completed one
+    text, _ = tokens.fit([("Business Problem", problem_statement), ("Success Criteria", success_criteria)],
+                         config.PROMPT_TOKEN_BUDGET)
+    return text
+
+
+def summarize_solution(solution: str) -> Prompt:
+    system_prompt = f"""Condense the SOLUTION for the next analysis steps. Keep: the business and its size, the AI approach and models, the data it relies on, who will use it and the kind of work they do, success metrics. Bullet points only, no introduction. At most {config.SUMMARY_MAX_TOKENS * 3 // 4} words."""
+    user_message, saved = tokens.fit([("SOLUTION", solution)], config.PROMPT_TOKEN_BUDGET)
+    return Prompt('solution_summary', system_prompt, user_message, 0.2, config.SUMMARY_MAX_TOKENS,
+                  tokens_saved=saved)
+
+
+def with_summary(data: SessionData, build: Callable[..., Prompt], *args) -> Prompt:
+    # build(solution, *args) with the solution summary in place of the full solution once there is one
+    if not data.solution_summary:
+        return build(data.solution, *args)
+    prompt = build(data.solution_summary, *args)
+    saved = tokens.count(data.solution) - tokens.count(data.solution_summary)
+    return prompt._replace(tokens_saved=prompt.tokens_saved + max(0, saved))
+
+
+def classifier(stage: str, system_prompt: str, solution: str) -> Prompt:
+    user_message, saved = tokens.fit([("", solution)], config.CLASSIFIER_TOKEN_BUDGET)
+    return Prompt(stage, system_prompt, user_message, 0.2, 1024, timeout=config.OPENAI_CLASSIFIER_TIMEOUT,
+                  tokens_saved=saved)
+
+
+def check_small_business(solution: str) -> Prompt:
+    system_prompt = """Does the problem originate from a micro business or a freelancer?
+If yes, output only 'y'. If no, produce no output."""
+    return classifier('is_small_biz', system_prompt, solution)
+
+
+def analyze_small_biz_human_factors(solution: str, answer: str) -> Prompt:
+    system_prompt = """You are an expert Human Factors engineer. Analyze requirements for SOLUTION focusing on Procedures, Roles and Responsibilities.
+Make comprehensive requirement list. No introduction/conclusion. Only answer if certain. Answer with 250 tokens."""
+    user_message, saved = tokens.fit([("Q", "Which internal teams are responsible?"), ("A", answer),
+                                      ("SOLUTION", solution)], config.PROMPT_TOKEN_BUDGET)
+    return Prompt('small_biz_human_factors', system_prompt, user_message, 0.5, 1024, tokens_saved=saved)
+
+
+def check_dataset_needed(solution: str) -> Prompt:
+    system_prompt = """Does the solution require a dataset for development? If yes, print only 'y'. If no, produce no output."""
+    return classifier('dataset_needed', system_prompt, solution)
+
+
+def check_dataset_sufficiency(solution: str, dataset_info: Dict[str, str]) -> Prompt:
+    dataset_text = "\n".join([f"Q: {q}\nA: {a}" for q, a in dataset_info.items()])
+    system_prompt = """Is the available data sufficient? If adequate, output 'y'. If insufficient, produce no output."""
+    user_message, saved = tokens.fit([("SOLUTION", solution), ("DATASET", dataset_text)],
+                                     config.CLASSIFIER_TOKEN_BUDGET)
+    return Prompt('dataset_sufficient', system_prompt, user_message, 0.2, 1024,
+                  timeout=config.OPENAI_CLASSIFIER_TIMEOUT, tokens_saved=saved)
+
+
+def check_human_factors_detailed(solution: str) -> Prompt:
+    system_prompt = """Does the job involve significant physical activity or critical safety decisions? If any apply, output only 'y'; otherwise, output nothing."""
+    return classifier('human_factors_detailed', system_prompt, solution)
+
+
+SOLUTION_CHECKS = {
+    'is_small_biz': check_small_business, 'dataset_needed': check_dataset_needed,
+    'human_factors_detailed': check_human_factors_detailed
+}
+
+
+def tokens_saved(data: SessionData) -> float:
+    # Input tokens the session didn't send thanks to budgets and the solution summary,
+    # net of what writing the summary cost
+    summary = data.usage.get('solution_summary', {})
+    saved = metrics.summary_totals(data.usage)['tokens_saved']
+    return saved - summary.get('prompt_tokens', 0) - summary.get('completion_tokens', 0)
+
+
+# The same questions for the structured classification, answered together as JSON booleans
+SOLUTION_QUESTIONS = {
+    'is_small_biz': "Does the problem originate from a micro business or a freelancer?",
+    'dataset_needed': "Does the solution require a dataset for development?",
+    'human_factors_detailed': "Does the job involve significant physical activity or critical safety decisions?"
+}
+DATASET_QUESTIONS = {'dataset_sufficient': "Is the available DATASET sufficient for the SOLUTION?"}
+
+
+def classify(stage: str, questions: Dict[str, str], user_message: str, tokens_saved: int = 0) -> Prompt:
+    # One call answering every question, as a JSON object of booleans
+    system_prompt = "Answer each question about the input with true or false.\n" + \
+        "\n".join(f"{key}: {question}" for key, question in questions.items())
+    response_format = {"type": "json_schema", "json_schema": {"name": stage, "strict": True, "schema": {
+        "type": "object", "properties": {key: {"type": "boolean"} for key in questions},
+        "required": list(questions), "additionalProperties": False
+    }}}
+    return Prompt(stage, system_prompt, user_message, 0.0, 12 * len(questions) + 16,
+                  timeout=config.OPENAI_CLASSIFIER_TIMEOUT, tokens_saved=tokens_saved,
+                  response_format=response_format, optional=True)
+
+
+def classify_solution(solution: str) -> Prompt:
+    user_message, saved = tokens.fit([("", solution)], config.CLASSIFIER_TOKEN_BUDGET)
+    return classify('solution_checks', SOLUTION_QUESTIONS, user_message, saved)
+
+
+def classify_dataset(solution: str, dataset_info: Dict[str, str]) -> Prompt:
+    dataset_text = "\n".join([f"Q: {q}\nA: {a}" for q, a in dataset_info.items()])
+    user_message, saved = tokens.fit([("SOLUTION", solution), ("DATASET", dataset_text)],
+                                     config.CLASSIFIER_TOKEN_BUDGET)
+    return classify('dataset_checks', DATASET_QUESTIONS, user_message, saved)
+
+
+def parse_classification(response: str, keys: Collection[str]) -> Optional[Dict[str, bool]]:
+    # None unless the response is a JSON object with a boolean for every key
+    try:
+        values = json.loads(response)
+    except ValueError:
+        return None
+    if not isinstance(values, dict) or not all(isinstance(values.get(key), bool) for key in keys):
+        return None
+    return {key: values[key] for key in keys}
+
+
+def is_yes(response: str) -> bool:
+    # The y/n prompts sometimes answer "Y.", "'y'" or "yes"
+    return response.strip().strip("'\"`.").lower() in ('y', 'yes')
+
+
+def get_dataset_questions() -> List[str]:
+    return [
+        "Which datasets are available? Provide detailed description.",
+        "How large is each dataset?",
+        "Are datasets structured, unstructured, or both?",
+        "Were data collected consistently?",
+        "Who is responsible for data management?",
+        "What is the data quality?"
+    ]
+
+
+def analyze_tech_requirements(solution: str, dataset_info: Optional[str] = None, data_sufficient: bool = True) -> Prompt:
+    if dataset_info:
+        if data_sufficient:
+            system_prompt = """Analyze AI-based SOLUTION feasibility. Cover: 1) Model & Architecture, 2) Infrastructure & Tools, 3) Skill Sets, 4) Testing. No introduction/conclusion. 400 tokens."""
+        else:
+            system_prompt = """Analyze AI-based SOLUTION feasibility. Cover: 1) Model & Architecture, 2) Infrastructure & Tools, 3) Skill Sets, 4) Testing, 5) Data Assessment (more data needed, duration, quality improvements, divisions involved). 400 tokens."""
+        sections = [("DATASET", dataset_info), ("SOLUTION", solution)]
+    else:
+        system_prompt = """Analyze AI-based SOLUTION feasibility. Cover: 1) Model & Architecture, 2) Infrastructure & Tools, 3) Skill Sets, 4) Testing. 400 tokens."""
+        sections = [("", "No dataset available."), ("SOLUTION", solution)]
+    user_message, saved = tokens.fit(sections, config.PROMPT_TOKEN_BUDGET)
+    return Prompt('tech_requirements', system_prompt, user_message, 0.5, 1024, stream=True, tokens_saved=saved)
+
+
+def tech_analysis_prompt(data: SessionData) -> Prompt:
+    dataset_text = None
+    data_sufficient = True
+    if data.dataset_needed:
+        dataset_text = "\n".join([f"Q: {q}\nA: {a}" for q, a in data.dataset_info.items()])
+        data_sufficient = data.dataset_sufficient
+    return with_summary(data, analyze_tech_requirements, dataset_text, data_sufficient)
+
+
+def get_human_factors_questions(detailed: bool) -> List[str]:
+    if detailed:
+        return [
+            "How is your problem currently being solved?",
+            "Which internal teams are responsible?",
+            "Do teams need to interact or collaborate?",
+            "What procedures do they follow?",
+            "What information do they need?",
+            "What tools and equipment are used?",
+            "What competencies are required?",
+            "What training is available?",
+            "What is the current workplace?",
+            "How many workstations?",
+            "What is the division of tasks?",
+            "What is the shift pattern?"
+        ]
+    else:
+        return [
+            "Which internal teams are responsible?",
+            "Do teams need to interact or collaborate?",
+            "What procedures do they follow?"
+        ]
+
+
+def analyze_human_factors(solution: str, answers: Dict[str, str], detailed: bool) -> Prompt:
+    answers_text = "\n".join([f"Q: {q}\nA: {a}" for q, a in answers.items()])
+    if detailed:
+        system_prompt = """Analyze human factors for SOLUTION. Domains: 1) Teams and Communication, 2) Procedures/Roles, 3) Human Machine Interaction, 4) Skills and Training, 5) Organisation of Work, 6) Environment. 250 tokens per domain."""
+    else:
+        system_prompt = """Analyze human factors for SOLUTION. Domains: 1) Teams and Communication, 2) Procedures/Roles, 3) Human Machine Interaction, 4) Skills and Training. 250 tokens per domain."""
+    user_message, saved = tokens.fit([("Human Factors", answers_text), ("SOLUTION", solution)],
+                                     config.PROMPT_TOKEN_BUDGET)
+    return Prompt('human_factors_analysis', system_prompt, user_message, 0.5, 1024, stream=True, tokens_saved=saved)
+
+
+def generate_timeline(solution: str, tech_req: str, hf_req: str, user_timeline: str) -> Prompt:
+    system_prompt = """Generate two timelines: 1) Rapid (No Procurement Delays), 2) Extended (With Procurement Delays). Break down into phases. 200 tokens."""
+    user_message, saved = tokens.fit([("SOLUTION", solution), ("TECH", tech_req), ("HF", hf_req),
+                                      ("USER TIMELINE", user_timeline)], config.PROMPT_TOKEN_BUDGET)
+    return Prompt('timeline', system_prompt, user_message, 0.2, 4096, stream=True, tokens_saved=saved)
+
+
+class Engine:
+    # Runs the MANOVAT interview for one Session at a time, with no UI dependency.
+    # The flow itself is the _run generator: it yields the LLM calls it needs and
+    # receives their text back, so sync and async drivers share one state machine.
+    def __init__(self, api_key: str, checkpoint: Optional[Callable[[Session], None]] = None,
+                 limiter: Optional[RateLimiter] = None, index: Optional[AnalysisIndex] = None,
+                 background: bool = True):
+        self.api_key = api_key
+        # Called with the session at the end of each step and, after a state transition, before the
+        # next call goes out (so a crash resumes from the new state); astep runs it off the event loop
+        self.checkpoint = checkpoint
+        # Shared RPM/TPM budget for every call this engine makes (batch runs)
+        self.limiter = limiter
+        # Completed analyses that new sessions can reuse (MANOVAT_REUSE_INDEX by default)
+        self.index = index if index is not None else get_index()
+        # Background calls only live in this process: off when the next step may load the session
+        # elsewhere, those collected by a later step are made when their result is needed
+        self.background = background
+
+    # Every call is recorded in manovat.metrics and, given a session's usage dict, in its summary.
+    # Failed calls raise llm.LLMError out of step()/astep(); the session stays in the state that
+    # failed (checkpointed) and calling step(session) again without input retries it.
+    def complete(self, prompt: Prompt, usage: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        stats = metrics.CallStats(prompt.stage, prompt.tokens_saved)
+        try:
+            return llm.chat(self.api_key, prompt.system_prompt, prompt.user_message, prompt.temperature,
+                            prompt.max_tokens, timeout=prompt.timeout, stats=stats, limiter=self.limiter,
+                            response_format=prompt.response_format)
+        except Exception as e:
+            stats.error = str(e)
+            if prompt.optional and isinstance(e, llm.LLMError):
+                return ''
+            raise
+        finally:
+            metrics.record_call(stats, usage)
+
+    def stream(self, prompt: Prompt, usage: Optional[Dict[str, Dict[str, float]]] = None) -> Iterator[str]:
+        stats = metrics.CallStats(prompt.stage, prompt.tokens_saved)
+        try:
+            yield from llm.stream_chat(self.api_key, prompt.system_prompt, prompt.user_message, prompt.temperature,
+                                       prompt.max_tokens, timeout=prompt.timeout, stats=stats, limiter=self.limiter)
+        except Exception as e:
+            stats.error = str(e)
+            raise
+        finally:
+            metrics.record_call(stats, usage)
+
+    async def acomplete(self, prompt: Prompt, usage: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        stats = metrics.CallStats(prompt.stage, prompt.tokens_saved)
+        try:
+            return await llm.achat(self.api_key, prompt.system_prompt, prompt.user_message, prompt.temperature,
+                                   prompt.max_tokens, timeout=prompt.timeout, stats=stats, limiter=self.limiter,
+                                   response_format=prompt.response_format)
+        except Exception as e:
+            stats.error = str(e)
+            if prompt.optional and isinstance(e, llm.LLMError):
+                return ''
+            raise
+        finally:
+            metrics.record_call(stats, usage)
+
+    async def astream(self, prompt: Prompt, usage: Optional[Dict[str, Dict[str, float]]] = None) -> AsyncIterator[str]:
+        stats = metrics.CallStats(prompt.stage, prompt.tokens_saved)
+        try:
+            async for chunk in llm.astream_chat(self.api_key, prompt.system_prompt, prompt.user_message,
+                                                prompt.temperature, prompt.max_tokens, timeout=prompt.timeout,
+                                                stats=stats, limiter=self.limiter):
+                yield chunk
+        except Exception as e:
+            stats.error = str(e)
+            raise
+        finally:
+            metrics.record_call(stats, usage)
+
+    def embed(self, text: str, stage: str, usage: Optional[Dict[str, Dict[str, float]]] = None) -> List[float]:
+        stats = metrics.CallStats(stage)
+        try:
+            return llm.embed(self.api_key, [text], stats=stats, limiter=self.limiter)[0]
+        except Exception as e:
+            stats.error = str(e)
+            raise
+        finally:
+            metrics.record_call(stats, usage)
+
+    async def aembed(self, text: str, stage: str, usage: Optional[Dict[str, Dict[str, float]]] = None) -> List[float]:
+        stats = metrics.CallStats(stage)
+        try:
+            return (await llm.aembed(self.api_key, [text], stats=stats, limiter=self.limiter))[0]
+        except Exception as e:
+            stats.error = str(e)
+            raise
+        finally:
+            metrics.record_call(stats, usage)
+
+    def _start(self, prompt: Prompt, usage: Optional[Dict[str, Dict[str, float]]] = None) -> Union[str, Iterator[str]]:
+        return self.stream(prompt, usage) if prompt.stream else self.complete(prompt, usage)
+
+    def awaiting_input(self, session: Session) -> bool:
+        # True when the last message is a question the next input answers. A step that stopped
+        # partway (a failed call, or a Streamlit rerun during a streamed generation) leaves the
+        # session in a state that has to be resumed with step(session) first.
+        if not session.messages:
+            return True
+        data = session.data
+        return session.state in INPUT_STATES and data.question_asked and not data.error
+
+    def placeholder(self, session: Session) -> Optional[str]:
+        if not self.awaiting_input(session):
+            return None
+        return PLACEHOLDERS.get(session.state, "Your answer...")
+
+    def step(self, session: Session, user_input: Optional[str] = None,
+             on_stream: Optional[Callable[[Prompt, Iterator[str]], str]] = None) -> StepResult:
+        # Applies user_input and advances until the next question (or COMPLETE).
+        # on_stream, if given, displays streamed generations and returns their full text.
+        self._check_retry(session, user_input)
+        start = len(session.messages)
+        run = self._run(session, user_input)
+        reply: Any = None
+        saved = session.state
+        try:
+            while True:
+                try:
+                    effect = run.send(reply)
+                except StopIteration:
+                    break
+                if session.state != saved and self.checkpoint is not None:
+                    saved = session.state
+                    self.checkpoint(session)
+                reply = self._handle(session, effect, on_stream)
+        except llm.LLMError as e:
+            session.data.error = str(e)
+            raise
+        else:
+            session.data.error = ''
+        finally:
+            if self.checkpoint is not None:
+                self.checkpoint(session)
+        return self._result(session, start)
+
+    def _handle(self, session: Session, effect: Effect,
+                on_stream: Optional[Callable[[Prompt, Iterator[str]], str]]) -> Any:
+        usage = session.data.usage
+        if isinstance(effect, list):
+            executor = llm.get_executor()
+            futures = [executor.submit(self.complete, prompt, usage) for prompt in effect]
+            return [future.result() for future in futures]
+        if isinstance(effect, (Lookup, Remember)):
+            # Best effort: when the index can't answer the flow generates as usual
+            if self.index is None:
+                return None
+            vector = session.data.reuse_vector if isinstance(effect, Remember) else None
+            if not vector:
+                try:
+                    vector = self.embed(effect.text, 'reuse_lookup' if isinstance(effect, Lookup) else 'reuse_index',
+                                        usage)
+                except llm.LLMError as e:
+                    return self._reuse_failed(effect, e)
+            return self._index_effect(session, effect, vector)
+        if isinstance(effect, Background):
+            if effect.across_steps and not self.background:
+                return None
+            # Its usage is merged into the session when collected, so only this thread writes to it
+            background_usage: Dict[str, Dict[str, float]] = {}
+            session.pending[effect.prompt.stage] = (llm.Prefetch(self._start, effect.prompt, background_usage),
+                                                    background_usage)
+            return None
+        prefetched = session.pending.pop(effect.stage, None)
+        if prefetched is None:
+            if not effect.stream:
+                return self.complete(effect, usage)
+            chunks = self.stream(effect, usage)
+            return on_stream(effect, chunks) if on_stream is not None else "".join(chunks)
+        call, background_usage = prefetched
+        if not effect.stream:
+            text = call.result()
+        else:
+            text = on_stream(effect, iter(call)) if on_stream is not None else "".join(call)
+        metrics.merge_usage(usage, background_usage)
+        return text
+
+    async def astep(self, session: Session, user_input: Optional[str] = None,
+                    on_stream: Optional[Callable[[Prompt, AsyncIterator[str]], Awaitable[str]]] = None) -> StepResult:
+        # Same as step, driven on the event loop with AsyncOpenAI
+        self._check_retry(session, user_input)
+        start = len(session.messages)
+        run = self._run(session, user_input)
+        reply: Any = None
+        saved = session.state
+        try:
+            while True:
+                try:
+                    effect = run.send(reply)
+                except StopIteration:
+                    break
+                if session.state != saved and self.checkpoint is not None:
+                    saved = session.state
+                    await self._acheckpoint(session)
+                reply = await self._ahandle(session, effect, on_stream)
+        except llm.LLMError as e:
+            session.data.error = str(e)
+            raise
+        else:
+            session.data.error = ''
+        finally:
+            if self.checkpoint is not None:
+                await self._acheckpoint(session)
+        return self._result(session, start)
+
+    async def _acheckpoint(self, session: Session):
+        # SQLite and Redis stores block
+        await asyncio.get_running_loop().run_in_executor(None, self.checkpoint, session)
+
+    async def _ahandle(self, session: Session, effect: Effect,
+                       on_stream: Optional[Callable[[Prompt, AsyncIterator[str]], Awaitable[str]]]) -> Any:
+        usage = session.data.usage
+        if isinstance(effect, list):
+            return list(await asyncio.gather(*(self.acomplete(prompt, usage) for prompt in effect)))
+        if isinstance(effect, (Lookup, Remember)):
+            if self.index is None:
+                return None
+            vector = session.data.reuse_vector if isinstance(effect, Remember) else None
+            if not vector:
+                try:
+                    vector = await self.aembed(effect.text,
+                                               'reuse_lookup' if isinstance(effect, Lookup) else 'reuse_index', usage)
+                except llm.LLMError as e:
+                    return self._reuse_failed(effect, e)
+            # Reads and appends the index files, waiting for other processes' writes
+            return await asyncio.get_running_loop().run_in_executor(None, self._index_effect, session, effect, vector)
+        if isinstance(effect, Background):
+            if effect.across_steps and not self.background:
+                return None
+            # As in _handle: the task may outlive this session object (stores that load a fresh one)
+            background_usage: Dict[str, Dict[str, float]] = {}
+            task = asyncio.ensure_future(self.acomplete(effect.prompt, background_usage))
+            session.pending[effect.prompt.stage] = (task, background_usage)
+            return None
+        prefetched = session.pending.pop(effect.stage, None)
+        if prefetched is not None:
+            task, background_usage = prefetched
+            text = await task
+            metrics.merge_usage(usage, background_usage)
+            return text
+        if effect.stream and on_stream is not None:
+            return await on_stream(effect, self.astream(effect, usage))
+        return await self.acomplete(effect, usage)
+
+    def _index_effect(self, session: Session, effect: Union[Lookup, Remember],
+                      vector: List[float]) -> Optional[Match]:
+        # ValueError: a vector of another size than the index's, or an unreadable entry
+        data = session.data
+        try:
+            if isinstance(effect, Remember):
+                data.reuse_vector = []
+                self.index.add(vector, effect.entry)
+                return None
+            matches = self.index.search(vector, config.REUSE_THRESHOLD)
+        except (OSError, ValueError) as e:
+            return self._reuse_failed(effect, e)
+        metrics.REUSE_LOOKUPS.inc('hit' if matches else 'miss')
+        # Remember embeds the same problem and success criteria, so it takes this vector over
+        data.reuse_vector = [] if matches else vector
+        return matches[0] if matches else None
+
+    def _reuse_failed(self, effect: Union[Lookup, Remember], error: Exception) -> None:
+        if isinstance(effect, Lookup):
+            metrics.REUSE_LOOKUPS.inc('error')
+        logger.warning("Reuse index %s failed: %s", "lookup" if isinstance(effect, Lookup) else "update", error)
+        return None
+
+    def _reuse(self, session: Session, match: Match, solution: str):
+        data = session.data
+        for name in REUSE_FIELDS:
+            setattr(data, name, match.entry[name])
+        data.solution = solution
+        data.solution_checks = dict(data.solution_checks)
+        data.reused_from = match.entry['id']
+        session.messages.append("assistant", f"Your problem is very close to one analysed before "
+                                             f"({match.score:.0%} similar), so its solution is reused here.")
+        session.messages.append("assistant", data.solution)
+
+    def _check_retry(self, session: Session, user_input: Optional[str]):
+        # Mid-state (after a failed or interrupted step) input would be taken as the answer to
+        # whichever question the flow reaches next, one the user hasn't seen
+        if user_input is None:
+            return
+        if session.data.error:
+            raise ValueError("The previous step failed; retry it with step(session) before sending input.")
+        if not self.awaiting_input(session):
+            raise ValueError("No question is waiting for an answer; continue with step(session) first.")
+
+    def _result(self, session: Session, start: int) -> StepResult:
+        messages = [message for message in session.messages.items[start:] if message.show_to_user]
+        return StepResult(session.state, messages, self.placeholder(session), session.data.error)
+
+    def _transition(self, session: Session, state: str):
+        metrics.TRANSITIONS.inc(session.state, state)
+        if state == ConversationState.COMPLETE:
+            metrics.REPORTS.inc()
+        session.state = state
+
+    def _ask(self, session: Session, question: str, numbered: bool = True):
+        data = session.data
+        if data.question_asked:
+            return
+        if numbered:
+            data.total_questions_asked += 1
+            question = f"**Question {data.total_questions_asked}:** {question}"
+        session.messages.append("assistant", question)
+        data.question_asked = True
+
+    def _run(self, session: Session, user_input: Optional[str]) -> Generator[Effect, Any, None]:
+        data = session.data
+        if not session.messages:
+            session.messages.append("assistant", WELCOME_MESSAGE)
+            data.question_asked = True
+        if session.state == ConversationState.COMPLETE:
+            return
+        if user_input is not None:
+            session.messages.append("user", user_input)
+        while True:
+            state = session.state
+            started = time.perf_counter()
+            if state == ConversationState.WELCOME:
+                if user_input is None:
+                    return
+                data.problem_statement = user_input
+                data.total_questions_asked += 1
+                data.question_asked = False
+                user_input = None
+                self._transition(session, ConversationState.SUCCESS_CRITERIA)
+
+            elif state == ConversationState.SUCCESS_CRITERIA:
+                self._ask(session, "**What are your success criteria for this project?**", numbered=False)
+                if user_input is None:
+                    return
+                data.success_criteria = user_input
+                data.total_questions_asked += 1
+                data.question_asked = False
+                user_input = None
+                self._transition(session, ConversationState.ANALYZING_SOLUTION)
+
+            elif state == ConversationState.ANALYZING_SOLUTION:
+                # Each result is kept as soon as it arrives, so a retry after a failed call resumes here
+                if not data.solution:
+                    # A near-identical problem analysed before brings its solution and checks; only
+                    # the restated problem is written for this one
+                    match = yield Lookup(reuse_query(data.problem_statement, data.success_criteria))
+                    rest = reused_solution(match.entry['solution']) if match is not None else None
+                    if rest is not None:
+                        challenge = yield restate_problem(data.problem_statement, data.success_criteria)
+                        self._reuse(session, match, challenge.strip() + "\n\n" + rest)
+                    else:
+                        solution = yield analyze_problem_and_solution(data.problem_statement, data.success_criteria)
+                        data.solution = solution
+                        session.messages.append("assistant", solution)
+                # The summary that the later stages get instead of the full solution is written
+                # while the checks run
+                if not data.solution_summary:
+                    yield Background(summarize_solution(data.solution))
+                if not data.solution_checks:
+                    data.solution_checks = yield from self._classify(
+                        classify_solution(data.solution), SOLUTION_QUESTIONS,
+                        lambda key: SOLUTION_CHECKS[key](data.solution))
+                if not data.solution_summary:
+                    data.solution_summary = (yield summarize_solution(data.solution)).strip()
+                session.messages.append("assistant", "Analysis complete. Evaluating business context...", False)
+                self._transition(session, ConversationState.SMALL_BIZ_CHECK)
+
+            elif state == ConversationState.SMALL_BIZ_CHECK:
+                is_small_biz = yield from self._solution_check(session, 'is_small_biz')
+                data.is_small_biz = is_small_biz
+                if is_small_biz:
+                    session.messages.append("assistant", "I need to understand your current operational context.")
+                    self._transition(session, ConversationState.SMALL_BIZ_QUESTION)
+                else:
+                    session.messages.append("assistant", "Proceeding with technical evaluation...", False)
+                    self._transition(session, ConversationState.DATASET_CHECK)
+
+            elif state == ConversationState.SMALL_BIZ_QUESTION:
+                question = "Which internal teams are responsible for executing the activities?"
+                if question not in data.human_factors_info:
+                    self._ask(session, question)
+                    if user_input is None:
+                        return
+                    data.human_factors_info[question] = user_input
+                    data.question_asked = False
+                    user_input = None
+                data.human_factors_analysis = yield with_summary(data, analyze_small_biz_human_factors,
+                                                                 data.human_factors_info[question])
+                data.tech_requirements = "Simplified analysis for small business context."
+                session.messages.append("assistant", "Analysis complete. Moving to timeline planning...", False)
+                self._transition(session, ConversationState.TIMELINE)
+
+            elif state == ConversationState.DATASET_CHECK:
+                needs_dataset = yield from self._solution_check(session, 'dataset_needed')
+                data.dataset_needed = needs_dataset
+                if needs_dataset:
+                    session.messages.append("assistant", "I need to understand your data availability.")
+                    self._transition(session, ConversationState.DATASET_QUESTIONS)
+                else:
+                    session.messages.append("assistant", "Proceeding with technical analysis...", False)
+                    self._transition(session, ConversationState.TECH_ANALYSIS)
+
+            elif state == ConversationState.DATASET_QUESTIONS:
+                questions = get_dataset_questions()
+                current_q = data.current_dataset_question
+                if current_q < len(questions):
+                    self._ask(session, questions[current_q])
+                    if user_input is None:
+                        return
+                    data.dataset_info[questions[current_q]] = user_input
+                    data.current_dataset_question += 1
+                    data.question_asked = False
+                    user_input = None
+                else:
+                    self._transition(session, ConversationState.DATASET_SUFFICIENCY_CHECK)
+
+            elif state == ConversationState.DATASET_SUFFICIENCY_CHECK:
+                checks = yield from self._classify(
+                    with_summary(data, classify_dataset, data.dataset_info), DATASET_QUESTIONS,
+                    lambda key: with_summary(data, check_dataset_sufficiency, data.dataset_info))
+                data.dataset_sufficient = checks['dataset_sufficient']
+                session.messages.append("assistant", "Data assessment complete...", False)
+                self._transition(session, ConversationState.TECH_ANALYSIS)
+
+            elif state == ConversationState.TECH_ANALYSIS:
+                # The human factors questions don't depend on the technical analysis, so it
+                # runs in the background while the user answers them
+                yield Background(tech_analysis_prompt(data), across_steps=True)
+                session.messages.append("assistant", "Technical analysis started...", False)
+                self._transition(session, ConversationState.HUMAN_FACTORS_CHECK)
+
+            elif state == ConversationState.HUMAN_FACTORS_CHECK:
+                needs_detailed_hf = yield from self._solution_check(session, 'human_factors_detailed')
+                data.human_factors_detailed = needs_detailed_hf
+                session.messages.append("assistant", "I need to understand your current operations.")
+                self._transition(session, ConversationState.HUMAN_FACTORS_QUESTIONS)
+
+            elif state == ConversationState.HUMAN_FACTORS_QUESTIONS:
+                detailed = data.human_factors_detailed
+                questions = get_human_factors_questions(detailed)
+                current_q = data.current_hf_question
+                if current_q < len(questions):
+                    self._ask(session, questions[current_q])
+                    if user_input is None:
+                        return
+                    data.human_factors_info[questions[current_q]] = user_input
+                    data.current_hf_question += 1
+                    data.question_asked = False
+                    user_input = None
+                else:
+                    if not data.tech_requirements:
+                        tech_req = yield tech_analysis_prompt(data)
+                        data.tech_requirements = tech_req
+                        session.messages.append("assistant", tech_req)
+                        session.messages.append("assistant", "Technical analysis complete...", False)
+                    hf_analysis = yield with_summary(data, analyze_human_factors, data.human_factors_info, detailed)
+                    data.human_factors_analysis = hf_analysis
+                    session.messages.append("assistant", hf_analysis)
+                    session.messages.append("assistant", "Human factors analysis complete...", False)
+                    self._transition(session, ConversationState.TIMELINE)
+
+            elif state == ConversationState.TIMELINE:
+                if not data.planned_timeline:
+                    self._ask(session, "What is your planned timeline from project ideation to deployment?")
+                    if user_input is None:
+                        return
+                    data.planned_timeline = user_input
+                    data.question_asked = False
+                    user_input = None
+                hf_req = data.human_factors_analysis or 'Not applicable'
+                timeline = yield with_summary(data, generate_timeline, data.tech_requirements, hf_req,
+                                              data.planned_timeline)
+                data.timeline = timeline
+                data.completed_at = datetime.now().isoformat()
+                if not data.reused_from:
+                    yield Remember(reuse_query(data.problem_statement, data.success_criteria), {
+                        'id': session.id, 'problem_statement': data.problem_statement,
+                        'success_criteria': data.success_criteria, 'completed_at': data.completed_at,
+                        **{name: getattr(data, name) for name in REUSE_FIELDS}
+                    })
+                session.messages.append("assistant", timeline)
+                session.messages.append("assistant", "Analysis complete! Your comprehensive MANOVAT report is ready.")
+                self._transition(session, ConversationState.COMPLETE)
+
+            else:
+                return
+            # Only reached when the state was processed (not while waiting for the user's answer)
+            metrics.STATE_SECONDS.observe(state, value=time.perf_counter() - started)
+
+    def _classify(self, structured: Prompt, questions: Dict[str, str],
+                  fallback: Callable[[str], Prompt]) -> Generator[Effect, Any, Dict[str, bool]]:
+        # One structured call answers every question; when it fails, doesn't return the expected
+        # JSON or structured checks are off, one y/n prompt per question (in one round-trip)
+        if config.STRUCTURED_CHECKS:
+            answers = parse_classification((yield structured), questions)
+            if answers is not None:
+                return answers
+        responses = yield [fallback(key) for key in questions]
+        return {key: is_yes(response) for key, response in zip(questions, responses)}
+
+    def _solution_check(self, session: Session, key: str) -> Generator[Effect, Any, bool]:
+        checks = session.data.solution_checks
+        if key not in checks:
+            checks[key] = is_yes((yield SOLUTION_CHECKS[key](session.data.solution)))
+        return checks[key]
@@ -0,0 +1,230 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from manovat import config
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no lock across processes, so only one process may write a given path
+    fcntl = None
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# NumPy is imported when an index is opened; reuse is off unless MANOVAT_REUSE_INDEX is set
+
+logger = logging.getLogger(__name__)
+
+# What a new session with a near-identical problem takes over from a completed one. The summary
+# keeps the earlier business's details, and tech requirements and the later stages depend on the
+# interview's answers, so they are always generated.
+REUSE_FIELDS = ('solution', 'solution_checks')
+
+
+class Match(NamedTuple):
+    score: float
+    entry: Dict[str, Any]
+
+
+class AnalysisIndex:
+    # Unit-length embeddings in the rows of one float32 matrix, so a query is one matrix-vector
+    # product (cosine similarity). With a path the index is kept in append-only files:
+    # <path>.f32 (raw vectors), <path>.jsonl (one entry per row) and <path>.json (model and
+    # dimensions). Only the vectors and the entries' file offsets stay in memory; an entry is
+    # read back when it matches. Processes sharing a path take turns appending under a lock on
+    # <path>.lock, and each loads the rows the others appended before it searches or adds.
+    def __init__(self, path: str = "", model: str = "", dimensions: int = 0):
+        import numpy as np
+        self.path = path
+        self.model = model
+        self.dimensions = 0
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        # Entries (in memory) or their offsets in <path>.jsonl, and where the last loaded one ends
+        self._entries: List[Union[Dict[str, Any], int]] = []
+        self._end = 0
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with self._file_lock(exclusive=True):
+                if self._read_meta(dimensions):
+                    self._refresh(repair=True)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, vector: Sequence[float], entry: Dict[str, Any]):
+        import numpy as np
+        self.add_many(np.asarray([vector], dtype=np.float32), [entry])
+
+    def add_many(self, vectors: "np.ndarray", entries: Sequence[Dict[str, Any]]):
+        import numpy as np
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock, self._file_lock(exclusive=True):
+            if self.path and (self.dimensions or self._read_meta()):
+                self._refresh(repair=True)
+            if not self.dimensions:
+                self._start(vectors.shape[1])
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(f"Expected {self.dimensions}-dimensional vectors, got {vectors.shape[1]}")
+            if self.path:
+                lines = [json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n" for entry in entries]
+                with open(self.path + ".jsonl", "ab") as f:
+                    f.write(b"".join(lines))
+                with open(self.path + ".f32", "ab") as f:
+                    f.write(vectors.tobytes())
+                for line in lines:
+                    self._entries.append(self._end)
+                    self._end += len(line)
+            else:
+                self._entries.extend(entries)
+            self._append(vectors)
+
+    def search(self, vector: Sequence[float], threshold: float = 0.0, k: int = 1) -> List[Match]:
+        # The k most similar entries scoring at least threshold, best first
+        import numpy as np
+        with self._lock:
+            if self.path and self._changed():
+                with self._file_lock(exclusive=False):
+                    if self.dimensions or self._read_meta():
+                        self._refresh()
+            vectors, size = self._vectors, self._size
+        if size == 0:
+            return []
+        query = _normalize(np.asarray([vector], dtype=np.float32))[0]
+        scores = vectors[:size] @ query
+        if k == 1:
+            best = [int(np.argmax(scores))]
+        else:
+            top = np.argpartition(-scores, min(k, size) - 1)[:k]
+            best = top[np.argsort(-scores[top])].tolist()
+        return [Match(float(scores[i]), self._entry(i)) for i in best if scores[i] >= threshold]
+
+    def _start(self, dimensions: int, new: bool = True):
+        import numpy as np
+        self.dimensions = dimensions
+        self._vectors = np.zeros((1024, dimensions), dtype=np.float32)
+        if self.path and new:
+            with open(self.path + ".json", "w") as f:
+                json.dump({"model": self.model, "dimensions": dimensions}, f)
+
+    def _append(self, vectors: "np.ndarray"):
+        # Doubles the matrix when it is full; searches keep using the array they started with
+        import numpy as np
+        needed = self._size + len(vectors)
+        if needed > len(self._vectors):
+            grown = np.zeros((max(needed, 2 * len(self._vectors)), self.dimensions), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._vectors[self._size:needed] = vectors
+        self._size = needed
+
+    def _entry(self, row: int) -> Dict[str, Any]:
+        entry = self._entries[row]
+        if isinstance(entry, dict):
+            return entry
+        with open(self.path + ".jsonl", "rb") as f:
+            f.seek(entry)
+            return json.loads(f.readline())
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive: bool):
+        # Held exclusively while appending, shared while loading other processes' rows, so a
+        # reader never sees a row whose vector or entry is still being written
+        if not self.path or fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _changed(self) -> bool:
+        # Whether another process has written to the files since the last refresh
+        if not self.dimensions:
+            return os.path.exists(self.path + ".json")
+        return (_file_size(self.path + ".jsonl") != self._end
+                or _file_size(self.path + ".f32") != self._size * self.dimensions * 4)
+
+    def _read_meta(self, dimensions: int = 0) -> bool:
+        # False until some process adds the first row. dimensions: what the embeddings will have,
+        # 0 when unknown (the model's own size)
+        try:
+            with open(self.path + ".json") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return False
+        if self.model and meta["model"] != self.model:
+            raise ValueError(f"{self.path} was built with {meta['model']}, not {self.model}; "
+                             f"point MANOVAT_REUSE_INDEX at a new path")
+        if dimensions and meta["dimensions"] != dimensions:
+            raise ValueError(f"{self.path} holds {meta['dimensions']}-dimensional vectors, not {dimensions}; "
+                             f"point MANOVAT_REUSE_INDEX at a new path")
+        self._start(meta["dimensions"], new=False)
+        return True
+
+    def _refresh(self, repair: bool = False):
+        # Loads the rows appended since the last refresh (all of them on open). With repair, under
+        # the exclusive lock, also drops the extra row a writer that crashed between its two
+        # appends left in one of the files
+        import numpy as np
+        width = self.dimensions * 4
+        vectors = np.zeros(0, dtype=np.float32)
+        if _file_size(self.path + ".f32") > self._size * width:
+            vectors = np.fromfile(self.path + ".f32", dtype=np.float32, offset=self._size * width)
+        offsets = _line_offsets(self.path + ".jsonl", self._end)
+        rows = min(len(vectors) // self.dimensions, len(offsets) - 1)
+        if repair:
+            for suffix, size in ((".f32", (self._size + rows) * width), (".jsonl", offsets[rows])):
+                if _file_size(self.path + suffix) > size:
+                    os.truncate(self.path + suffix, size)
+        self._entries.extend(offsets[:rows])
+        self._end = offsets[rows]
+        self._append(vectors[:rows * self.dimensions].reshape(rows, self.dimensions))
+
+
+def _normalize(vectors: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _line_offsets(path: str, start: int = 0, chunk_size: int = 16 * 1024 * 1024) -> List[int]:
+    # Start of every line from start on, plus the end of the last complete one
+    import numpy as np
+    offsets = [start]
+    position = start
+    if _file_size(path) <= start:
+        return offsets
+    with open(path, "rb") as f:
+        f.seek(start)
+        while chunk := f.read(chunk_size):
+            offsets.extend((np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10) + position + 1).tolist())
+            position += len(chunk)
+    return offsets
+
+
+_index: Optional[AnalysisIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[AnalysisIndex]:
+    # Process-wide index at MANOVAT_REUSE_INDEX, None when reuse is off
+    global _index
+    if _index is None and config.REUSE_INDEX:
+        with _index_lock:
+            if _index is None:
+                _index = AnalysisIndex(config.REUSE_INDEX, config.EMBEDDING_MODEL, config.EMBEDDING_DIMENSIONS)
+                logger.info("Loaded %d analyses from %s", len(_index), config.REUSE_INDEX)
+    return _index
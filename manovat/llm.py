@@ -0,0 +1,417 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from manovat import config
+from manovat.cache import Cache, get_cache
+from manovat.metrics import CallStats
+from manovat.ratelimit import RateLimiter, estimate_tokens, get_limiter
+from manovat.resilience import AsyncCoalescer, CircuitBreaker, Coalescer, backoff_delay
+
+if TYPE_CHECKING:
+    import httpx
+    import openai
+
+# openai (and the pydantic models it loads) is the slowest import of the app and isn't needed
+# until the first call, so it is imported inside the functions that use it
+
+# One client (and one keep-alive connection pool) per API key, shared by every
+# Streamlit session and rerun in the process.
+_clients: "Dict[Tuple[str, Optional[str]], openai.OpenAI]" = {}
+_clients_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_breaker = CircuitBreaker()
+_coalescer = Coalescer()
+_async_coalescer = AsyncCoalescer()
+# Async clients are bound to the event loop that created their connections
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str]], openai.AsyncOpenAI]]" = \
+    weakref.WeakKeyDictionary()
+
+
+class LLMError(Exception):
+    # A call that failed for good: retries exhausted, a non-retryable API error, or the circuit is open
+    pass
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+def _retryable() -> Tuple[type, ...]:
+    # Worth retrying: 429s, timeouts, connection errors and 5xx
+    import openai
+    return openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError
+
+
+def _limits() -> "httpx.Limits":
+    import httpx
+    return httpx.Limits(
+        max_connections=config.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=config.OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=config.OPENAI_KEEPALIVE_EXPIRY
+    )
+
+
+def get_client(api_key: str, base_url: Optional[str] = None) -> "openai.OpenAI":
+    key = (api_key, base_url or config.OPENAI_BASE_URL)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                import httpx
+                import openai
+                client = openai.OpenAI(
+                    api_key=api_key, base_url=key[1],
+                    http_client=httpx.Client(limits=_limits(), timeout=config.OPENAI_TIMEOUT),
+                    timeout=config.OPENAI_TIMEOUT, max_retries=0
+                )
+                _clients[key] = client
+    return client
+
+
+def get_async_client(api_key: str, base_url: Optional[str] = None) -> "openai.AsyncOpenAI":
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    key = (api_key, base_url or config.OPENAI_BASE_URL)
+    client = clients.get(key)
+    if client is None:
+        import httpx
+        import openai
+        client = openai.AsyncOpenAI(
+            api_key=api_key, base_url=key[1],
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=config.OPENAI_TIMEOUT),
+            timeout=config.OPENAI_TIMEOUT, max_retries=0
+        )
+        clients[key] = client
+    return client
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _clients_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.LLM_WORKERS, thread_name_prefix="manovat-llm")
+    return _executor
+
+
+class Prefetch:
+    # Runs a (possibly streaming) call on the shared executor; iterating replays the
+    # chunks received so far and then follows the call until it finishes
+    def __init__(self, fn, *args, **kwargs):
+        self._chunks: List[str] = []
+        self._done = False
+        self._cond = threading.Condition()
+        self.future = get_executor().submit(self._run, fn, args, kwargs)
+
+    def _run(self, fn, args, kwargs) -> str:
+        try:
+            result = fn(*args, **kwargs)
+            for chunk in ([result] if isinstance(result, str) else result):
+                with self._cond:
+                    self._chunks.append(chunk)
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+        return "".join(self._chunks)
+
+    def __iter__(self) -> Iterator[str]:
+        position = 0
+        while True:
+            with self._cond:
+                while position >= len(self._chunks) and not self._done:
+                    self._cond.wait()
+                chunks = self._chunks[position:]
+            if not chunks:
+                self.future.result()
+                return
+            position += len(chunks)
+            yield from chunks
+
+    def result(self) -> str:
+        return self.future.result()
+
+
+def _messages(system_prompt: str, user_message: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+
+def _cache_lookup(system_prompt: str, user_message: str, temperature: float, max_tokens: int,
+                  stats: Optional[CallStats] = None, response_format: Optional[Dict[str, Any]] = None
+                  ) -> Tuple[Optional[Cache], str, Optional[str]]:
+    cache = get_cache() if temperature <= config.CACHE_MAX_TEMPERATURE else None
+    if cache is None:
+        return None, "", None
+    key = cache.make_key(config.OPENAI_MODEL, system_prompt, user_message, temperature, max_tokens, response_format,
+                         config.OPENAI_BASE_URL)
+    cached = cache.get(key)
+    if cached is not None and stats is not None:
+        stats.cache_hit = True
+    return cache, key, cached
+
+
+async def _off_loop(fn: Callable[..., Any], *args) -> Any:
+    # The response cache and the rate limits may live in SQLite or Redis: the async calls reach
+    # them from a thread, so a slow backend doesn't stall the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1)):
+        try:
+            return float(response.headers[header]) * scale
+        except (KeyError, ValueError):
+            pass
+    return None
+
+
+def _admit(api_key: str, system_prompt: str, user_message: str, max_tokens: int,
+           limiter: Optional[RateLimiter]) -> float:
+    # Runs before every request that isn't answered from the cache; returns the seconds to wait
+    # for the RPM/TPM limits (the call's share is already reserved)
+    if not api_key:
+        raise LLMError("API Key not configured.")
+    if not _breaker.allow():
+        raise CircuitOpenError("The AI service is failing; calls are paused for a few seconds.")
+    limiter = limiter if limiter is not None else get_limiter()
+    if limiter is None:
+        return 0.0
+    return limiter.reserve(estimate_tokens(system_prompt, user_message, max_tokens))
+
+
+def _giving_up(error: Exception) -> LLMError:
+    # 429s mean the service is up, just busy; they don't count towards opening the circuit
+    import openai
+    if isinstance(error, openai.APIStatusError) and not isinstance(error, openai.InternalServerError):
+        _breaker.success()
+    else:
+        _breaker.failure()
+    return LLMError(str(error))
+
+
+def _request(create: Callable[[], Any], stats: Optional[CallStats], max_retries: Optional[int] = None) -> Any:
+    # create() with jittered exponential backoff on retryable errors, honouring Retry-After
+    import openai
+    retryable = _retryable()
+    attempts = (max_retries if max_retries is not None else config.OPENAI_MAX_RETRIES) + 1
+    for attempt in range(attempts):
+        try:
+            result = create()
+        except retryable as e:
+            if attempt + 1 == attempts:
+                raise _giving_up(e) from e
+            if stats is not None:
+                stats.retries += 1
+            time.sleep(backoff_delay(attempt, _retry_after(e)))
+        except openai.OpenAIError as e:
+            raise _giving_up(e) from e
+        else:
+            _breaker.success()
+            return result
+
+
+async def _arequest(create: Callable[[], Awaitable[Any]], stats: Optional[CallStats],
+                    max_retries: Optional[int] = None) -> Any:
+    import openai
+    retryable = _retryable()
+    attempts = (max_retries if max_retries is not None else config.OPENAI_MAX_RETRIES) + 1
+    for attempt in range(attempts):
+        try:
+            result = await create()
+        except retryable as e:
+            if attempt + 1 == attempts:
+                raise _giving_up(e) from e
+            if stats is not None:
+                stats.retries += 1
+            await asyncio.sleep(backoff_delay(attempt, _retry_after(e)))
+        except openai.OpenAIError as e:
+            raise _giving_up(e) from e
+        else:
+            _breaker.success()
+            return result
+
+
+def chat(api_key: str, system_prompt: str, user_message: str, temperature: float = 0.5, max_tokens: int = 1024,
+         timeout: Optional[float] = None, max_retries: Optional[int] = None, stats: Optional[CallStats] = None,
+         limiter: Optional[RateLimiter] = None, response_format: Optional[Dict[str, Any]] = None) -> str:
+    # stats, if given, receives token usage, retries and cache hits for the call; limiter
+    # overrides the process-wide RPM/TPM limiter; response_format is passed to the API as is
+    # (structured outputs). Raises LLMError when the call fails.
+    cache, key, cached = _cache_lookup(system_prompt, user_message, temperature, max_tokens, stats, response_format)
+    if cached is not None:
+        return cached
+
+    def call() -> Tuple[str, Any]:
+        import openai
+        time.sleep(_admit(api_key, system_prompt, user_message, max_tokens, limiter))
+        response = _request(lambda: get_client(api_key).chat.completions.create(
+            model=config.OPENAI_MODEL,
+            messages=_messages(system_prompt, user_message),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout if timeout is not None else config.OPENAI_TIMEOUT,
+            response_format=response_format if response_format is not None else openai.NOT_GIVEN
+        ), stats, max_retries)
+        text = response.choices[0].message.content or ""
+        if cache is not None:
+            cache.set(key, text)
+        return text, response.usage
+
+    request_key = (api_key, config.OPENAI_BASE_URL, config.OPENAI_MODEL, system_prompt, user_message, temperature,
+                   max_tokens, json.dumps(response_format, sort_keys=True))
+    (text, usage), coalesced = _coalescer.run(request_key, call)
+    if stats is not None:
+        stats.coalesced = coalesced
+        if not coalesced:
+            stats.usage(usage)
+    return text
+
+
+def stream_chat(api_key: str, system_prompt: str, user_message: str, temperature: float = 0.5,
+                max_tokens: int = 1024, timeout: Optional[float] = None,
+                stats: Optional[CallStats] = None, limiter: Optional[RateLimiter] = None) -> Iterator[str]:
+    cache, key, cached = _cache_lookup(system_prompt, user_message, temperature, max_tokens, stats)
+    if cached is not None:
+        yield cached
+        return
+    import httpx
+    import openai
+    time.sleep(_admit(api_key, system_prompt, user_message, max_tokens, limiter))
+    chunks = []
+    # Only opening the stream is retried; once chunks have been shown the call can't be replayed
+    stream = _request(lambda: get_client(api_key).chat.completions.create(
+        model=config.OPENAI_MODEL,
+        messages=_messages(system_prompt, user_message),
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout if timeout is not None else config.OPENAI_TIMEOUT,
+        stream=True,
+        stream_options={"include_usage": True}
+    ), stats)
+    try:
+        with stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if stats is not None:
+                        stats.chunk()
+                    chunks.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+                elif chunk.usage is not None and stats is not None:
+                    stats.usage(chunk.usage)
+    except (openai.OpenAIError, httpx.HTTPError) as e:
+        raise _giving_up(e) from e
+    if cache is not None:
+        cache.set(key, "".join(chunks))
+
+
+async def achat(api_key: str, system_prompt: str, user_message: str, temperature: float = 0.5, max_tokens: int = 1024,
+                timeout: Optional[float] = None, stats: Optional[CallStats] = None,
+                limiter: Optional[RateLimiter] = None, response_format: Optional[Dict[str, Any]] = None) -> str:
+    cache, key, cached = await _off_loop(_cache_lookup, system_prompt, user_message, temperature, max_tokens, stats,
+                                         response_format)
+    if cached is not None:
+        return cached
+
+    async def call() -> Tuple[str, Any]:
+        import openai
+        await asyncio.sleep(await _off_loop(_admit, api_key, system_prompt, user_message, max_tokens, limiter))
+        response = await _arequest(lambda: get_async_client(api_key).chat.completions.create(
+            model=config.OPENAI_MODEL,
+            messages=_messages(system_prompt, user_message),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout if timeout is not None else config.OPENAI_TIMEOUT,
+            response_format=response_format if response_format is not None else openai.NOT_GIVEN
+        ), stats)
+        text = response.choices[0].message.content or ""
+        if cache is not None:
+            await _off_loop(cache.set, key, text)
+        return text, response.usage
+
+    request_key = (api_key, config.OPENAI_BASE_URL, config.OPENAI_MODEL, system_prompt, user_message, temperature,
+                   max_tokens, json.dumps(response_format, sort_keys=True))
+    (text, usage), coalesced = await _async_coalescer.run(request_key, call)
+    if stats is not None:
+        stats.coalesced = coalesced
+        if not coalesced:
+            stats.usage(usage)
+    return text
+
+
+def embed(api_key: str, texts: List[str], stats: Optional[CallStats] = None,
+          limiter: Optional[RateLimiter] = None) -> List[List[float]]:
+    # Embeddings (MANOVAT_EMBEDDING_MODEL) for the reuse index, in the order of texts
+    import openai
+    time.sleep(_admit(api_key, "", "\n".join(texts), 0, limiter))
+    response = _request(lambda: get_client(api_key).embeddings.create(
+        model=config.EMBEDDING_MODEL,
+        input=texts,
+        dimensions=config.EMBEDDING_DIMENSIONS or openai.NOT_GIVEN,
+        timeout=config.OPENAI_CLASSIFIER_TIMEOUT
+    ), stats)
+    if stats is not None:
+        stats.usage(response.usage)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+async def aembed(api_key: str, texts: List[str], stats: Optional[CallStats] = None,
+                 limiter: Optional[RateLimiter] = None) -> List[List[float]]:
+    import openai
+    await asyncio.sleep(await _off_loop(_admit, api_key, "", "\n".join(texts), 0, limiter))
+    response = await _arequest(lambda: get_async_client(api_key).embeddings.create(
+        model=config.EMBEDDING_MODEL,
+        input=texts,
+        dimensions=config.EMBEDDING_DIMENSIONS or openai.NOT_GIVEN,
+        timeout=config.OPENAI_CLASSIFIER_TIMEOUT
+    ), stats)
+    if stats is not None:
+        stats.usage(response.usage)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+async def astream_chat(api_key: str, system_prompt: str, user_message: str, temperature: float = 0.5,
+                       max_tokens: int = 1024, timeout: Optional[float] = None,
+                       stats: Optional[CallStats] = None, limiter: Optional[RateLimiter] = None) -> AsyncIterator[str]:
+    cache, key, cached = await _off_loop(_cache_lookup, system_prompt, user_message, temperature, max_tokens, stats)
+    if cached is not None:
+        yield cached
+        return
+    import httpx
+    import openai
+    await asyncio.sleep(await _off_loop(_admit, api_key, system_prompt, user_message, max_tokens, limiter))
+    chunks = []
+    stream = await _arequest(lambda: get_async_client(api_key).chat.completions.create(
+        model=config.OPENAI_MODEL,
+        messages=_messages(system_prompt, user_message),
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout if timeout is not None else config.OPENAI_TIMEOUT,
+        stream=True,
+        stream_options={"include_usage": True}
+    ), stats)
+    try:
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if stats is not None:
+                        stats.chunk()
+                    chunks.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+                elif chunk.usage is not None and stats is not None:
+                    stats.usage(chunk.usage)
+    except (openai.OpenAIError, httpx.HTTPError) as e:
+        raise _giving_up(e) from e
+    if cache is not None:
+        await _off_loop(cache.set, key, "".join(chunks))
@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Iterator, List, NamedTuple
+
+
+class Message(NamedTuple):
+    role: str
+    content: str
+    timestamp: str
+    show_to_user: bool = True
+
+
+class MessageStore:
+    # Chat transcript with a separate index of the messages shown to the user,
+    # so rendering never has to scan or filter the hidden ones
+    __slots__ = ('items', 'visible')
+
+    def __init__(self):
+        self.items: List[Message] = []
+        self.visible: List[int] = []
+
+    def append(self, role: str, content: str, show_to_user: bool = True) -> Message:
+        return self.restore(role, content, datetime.now().isoformat(), show_to_user)
+
+    def restore(self, role: str, content: str, timestamp: str, show_to_user: bool = True) -> Message:
+        # Appends a message keeping its original timestamp (used when loading a saved session)
+        message = Message(role, content, timestamp, show_to_user)
+        if show_to_user:
+            self.visible.append(len(self.items))
+        self.items.append(message)
+        return message
+
+    def visible_messages(self) -> Iterator[Message]:
+        return (self.items[i] for i in self.visible)
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from manovat import config
+
+logger = logging.getLogger(__name__)
+
+# Process-wide metrics, rendered in the Prometheus text exposition format
+_lock = threading.Lock()
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+USAGE_FIELDS = ('calls', 'seconds', 'prompt_tokens', 'completion_tokens', 'tokens_saved', 'cache_hits', 'retries',
+                'errors')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, value: float = 1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, key)} {value:g}" for key, value in sorted(self.values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, tuple(labels), tuple(buckets)
+        # Per label set: bucket counts (last one is +Inf), sum
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, *labels: str, value: float):
+        with _lock:
+            counts, total = self.values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total[0]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+LLM_REQUESTS = Counter("manovat_llm_requests_total",
+                       "LLM calls by stage and outcome (ok, cache_hit, coalesced, error).",
+                       ("stage", "outcome"))
+LLM_SECONDS = Histogram("manovat_llm_request_seconds", "LLM call latency by stage, including streaming.", ("stage",))
+LLM_FIRST_CHUNK_SECONDS = Histogram("manovat_llm_first_chunk_seconds", "Time to the first streamed chunk by stage.",
+                                    ("stage",))
+LLM_TOKENS = Counter("manovat_llm_tokens_total", "Tokens reported by the API by stage and kind (prompt, completion).",
+                     ("stage", "kind"))
+LLM_TOKENS_SAVED = Counter("manovat_llm_prompt_tokens_saved_total",
+                           "Prompt tokens cut by prompt budgets and the solution summary, by stage.", ("stage",))
+LLM_RETRIES = Counter("manovat_llm_retries_total", "Retried LLM requests by stage.", ("stage",))
+STATE_SECONDS = Histogram("manovat_state_seconds", "Engine time spent processing each conversation state.",
+                          ("state",))
+TRANSITIONS = Counter("manovat_state_transitions_total", "Conversation state transitions.", ("from_state", "to_state"))
+REPORTS = Counter("manovat_reports_completed_total", "Interviews that reached the final report.")
+REUSE_LOOKUPS = Counter("manovat_reuse_lookups_total",
+                        "Lookups of a prior analysis for a new problem by outcome (hit, miss, error).", ("outcome",))
+APP_RUN_SECONDS = Histogram("manovat_app_run_seconds",
+                            "Streamlit script runs by phase: imports, and the whole run when it reaches the end.",
+                            ("phase",), buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+REGISTRY = (LLM_REQUESTS, LLM_SECONDS, LLM_FIRST_CHUNK_SECONDS, LLM_TOKENS, LLM_TOKENS_SAVED, LLM_RETRIES,
+            STATE_SECONDS, TRANSITIONS, REPORTS, REUSE_LOOKUPS, APP_RUN_SECONDS)
+
+
+class CallStats:
+    # Filled in by manovat.llm for one call; the Engine records it once the call ends
+    __slots__ = ('stage', 'started', 'first_chunk', 'seconds', 'prompt_tokens', 'completion_tokens', 'tokens_saved',
+                 'cache_hit', 'coalesced', 'retries', 'error')
+
+    def __init__(self, stage: str, tokens_saved: int = 0):
+        self.stage = stage
+        self.started = time.perf_counter()
+        self.first_chunk: Optional[float] = None
+        self.seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # Prompt tokens the prompt budget cut before sending
+        self.tokens_saved = tokens_saved
+        self.cache_hit = False
+        # Answered by an identical request already in flight
+        self.coalesced = False
+        self.retries = 0
+        self.error: Optional[str] = None
+
+    def chunk(self):
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter() - self.started
+
+    def usage(self, usage):
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            # Embeddings only report prompt tokens
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+
+def record_call(stats: CallStats, summary: Optional[Dict[str, Dict[str, float]]] = None):
+    stats.seconds = time.perf_counter() - stats.started
+    if stats.cache_hit or stats.coalesced:
+        # Nothing was sent, so there was nothing to save
+        stats.tokens_saved = 0
+    outcome = "error" if stats.error else "cache_hit" if stats.cache_hit else "coalesced" if stats.coalesced else "ok"
+    LLM_REQUESTS.inc(stats.stage, outcome)
+    LLM_SECONDS.observe(stats.stage, value=stats.seconds)
+    if stats.first_chunk is not None and not stats.cache_hit:
+        LLM_FIRST_CHUNK_SECONDS.observe(stats.stage, value=stats.first_chunk)
+    if stats.prompt_tokens or stats.completion_tokens:
+        LLM_TOKENS.inc(stats.stage, "prompt", value=stats.prompt_tokens)
+        LLM_TOKENS.inc(stats.stage, "completion", value=stats.completion_tokens)
+    if stats.tokens_saved:
+        LLM_TOKENS_SAVED.inc(stats.stage, value=stats.tokens_saved)
+    if stats.retries:
+        LLM_RETRIES.inc(stats.stage, value=stats.retries)
+    if stats.error:
+        logger.warning("LLM call for stage %s failed after %.2fs: %s", stats.stage, stats.seconds, stats.error)
+    if summary is not None:
+        with _lock:
+            usage = summary.setdefault(stats.stage, dict.fromkeys(USAGE_FIELDS, 0))
+            for name, value in (('calls', 1), ('seconds', stats.seconds),
+                                ('prompt_tokens', stats.prompt_tokens), ('completion_tokens', stats.completion_tokens),
+                                ('tokens_saved', stats.tokens_saved),
+                                ('cache_hits', int(stats.cache_hit or stats.coalesced)), ('retries', stats.retries),
+                                ('errors', int(bool(stats.error)))):
+                usage[name] = round(usage.get(name, 0) + value, 3)
+
+
+def merge_usage(summary: Dict[str, Dict[str, float]], other: Dict[str, Dict[str, float]]):
+    with _lock:
+        for stage, values in other.items():
+            usage = summary.setdefault(stage, dict.fromkeys(USAGE_FIELDS, 0))
+            for name, value in values.items():
+                usage[name] = round(usage.get(name, 0) + value, 3)
+
+
+def summary_totals(summary: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    return {name: sum(usage.get(name, 0) for usage in summary.values()) for name in USAGE_FIELDS}
+
+
+def render() -> str:
+    lines: List[str] = []
+    with _lock:
+        for metric in REGISTRY:
+            lines += metric.render()
+    lines += _cache_lines()
+    return "\n".join(lines) + "\n"
+
+
+def _cache_lines() -> List[str]:
+    # The response cache keeps its own counters; only reported once the process has opened it
+    from manovat import cache
+    if cache._cache is None:
+        return []
+    stats = cache._cache.stats()
+    lines = []
+    for name, kind, help in (("hits", "counter", "Response cache hits."),
+                             ("misses", "counter", "Response cache misses."),
+                             ("evictions", "counter", "Response cache entries dropped by TTL or LRU."),
+                             ("entries", "gauge", "Entries in the response cache.")):
+        metric = f"manovat_cache_{name}_total" if kind == "counter" else f"manovat_cache_{name}"
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}", f"{metric} {stats[name]}"]
+    return lines
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def serve(port: int = config.METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    # Standalone /metrics endpoint for processes without their own HTTP routes (Streamlit);
+    # started once per process, port 0 disables it
+    global _server
+    if port <= 0:
+        return None
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Metrics endpoint not started on port %d: %s", port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True, name="manovat-metrics").start()
+    return _server
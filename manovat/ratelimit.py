@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Optional, Union
+
+from manovat import config, shared, tokens
+
+
+class TokenBucket:
+    # Refills at rate_per_minute up to capacity. reserve() always debits, so callers
+    # queue up in order: each one waits until the bucket is back to zero for them.
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+# Same arithmetic as TokenBucket.reserve, run atomically in Redis on its clock
+_RESERVE_SCRIPT = """
+local rate, capacity, amount = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate) - amount
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 60)
+return tostring(math.max(0, -tokens / rate))
+"""
+
+
+class RedisTokenBucket:
+    # A TokenBucket kept in Redis, so replicas sharing one OpenAI account share its limits
+    def __init__(self, client, key: str, rate_per_minute: float, capacity: Optional[float] = None):
+        self.key = key
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._reserve = client.register_script(_RESERVE_SCRIPT)
+
+    def reserve(self, amount: float = 1) -> float:
+        return float(self._reserve(keys=[self.key], args=[self.rate, self.capacity, amount]))
+
+
+Bucket = Union[TokenBucket, RedisTokenBucket]
+
+
+class RateLimiter:
+    # OpenAI-style limits: requests per minute and tokens (prompt + max completion) per minute;
+    # 0 disables either one. With a Redis client the buckets are shared by every process using it.
+    def __init__(self, rpm: float = config.OPENAI_RPM, tpm: float = config.OPENAI_TPM, client=None,
+                 prefix: str = "manovat:ratelimit:"):
+        self.requests = self._bucket(rpm, client, prefix + "requests")
+        self.tokens = self._bucket(tpm, client, prefix + "tokens")
+
+    @staticmethod
+    def _bucket(rate: float, client, key: str) -> Optional[Bucket]:
+        if rate <= 0:
+            return None
+        return RedisTokenBucket(client, key, rate) if client is not None else TokenBucket(rate)
+
+    def reserve(self, tokens: int) -> float:
+        wait = self.requests.reserve(1) if self.requests is not None else 0.0
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+
+def estimate_tokens(system_prompt: str, user_message: str, max_tokens: int) -> int:
+    # What the API counts against TPM: the prompt plus max_tokens
+    return tokens.count(system_prompt) + tokens.count(user_message) + max_tokens
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> Optional[RateLimiter]:
+    # Limiter sized from MANOVAT_OPENAI_RPM/TPM for the process, or for every replica with
+    # MANOVAT_REDIS_URL; None when both are unlimited
+    global _limiter
+    if _limiter is None and (config.OPENAI_RPM > 0 or config.OPENAI_TPM > 0):
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(config.OPENAI_RPM, config.OPENAI_TPM, shared.get_redis())
+    return _limiter
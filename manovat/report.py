@@ -0,0 +1,334 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO, StringIO
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape
+
+from manovat import config
+from manovat.resilience import Coalescer
+
+if TYPE_CHECKING:
+    from reportlab.lib.styles import ParagraphStyle, StyleSheet1
+    from reportlab.platypus import Flowable
+
+    from manovat.engine import SessionData
+
+# ReportLab is imported on the first render: only finished interviews need it
+
+logger = logging.getLogger(__name__)
+
+REPORT_FIELDS = (
+    'problem_statement', 'success_criteria', 'solution', 'tech_requirements',
+    'human_factors_analysis', 'timeline', 'completed_at'
+)
+
+# Rendered PDFs live in config.REPORT_DIR as <content hash>.pdf; concurrent requests for the
+# same report share one render
+_renders = Coalescer()
+_evict_lock = threading.Lock()
+
+# Markdown produced by the LLM
+_HEADING = re.compile(r"(#{1,6})\s+(.*?)\s*#*$")
+_BULLET = re.compile(r"(\s*)([-*+]|\d+[.)])\s+(.*)")
+_RULE = re.compile(r"(?:-\s*){3,}$|(?:\*\s*){3,}$|(?:_\s*){3,}$")
+_TABLE_RULE = re.compile(r"\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$")
+# Code spans, links and runs of emphasis markers, in the order they appear
+_SPAN = re.compile(r"`([^`]+)`|\[([^\]]+)\]\((https?://[^)\s]+)\)|(\*+|_+)")
+
+
+@lru_cache(maxsize=1)
+def get_styles() -> "StyleSheet1":
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='CustomTitle', fontSize=24, spaceAfter=12, alignment=TA_CENTER, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='CustomHeading', fontSize=16, spaceAfter=10, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='CustomBody', fontSize=11, spaceAfter=12, alignment=TA_JUSTIFY))
+    # Markdown blocks inside the sections
+    styles.add(ParagraphStyle(name='MdHeading', fontSize=13, leading=16, spaceBefore=6, spaceAfter=6,
+                              fontName='Helvetica-Bold'))
+    for level in range(3):
+        styles.add(ParagraphStyle(name=f'MdBullet{level}', parent=styles['CustomBody'], spaceAfter=4,
+                                  leftIndent=18 * (level + 1), bulletIndent=18 * level + 4))
+    styles.add(ParagraphStyle(name='MdCode', fontName='Courier', fontSize=9, leading=11, spaceAfter=10,
+                              leftIndent=12))
+    styles.add(ParagraphStyle(name='MdCell', fontSize=9, leading=11))
+    styles.add(ParagraphStyle(name='MdHeaderCell', parent=styles['MdCell'], fontName='Helvetica-Bold'))
+    return styles
+
+
+def inline_markup(text: str) -> str:
+    # Markdown spans to ReportLab paragraph markup; everything else is escaped, so LLM output
+    # containing '<' or '&' can't break the paragraph parser
+    return _spans(escape(text))
+
+
+def _spans(text: str) -> str:
+    # Emphasis markers are paired like brackets, innermost first, so <b> and <i> always nest
+    # ('***x***', '**a *b***'); a marker without a partner stays as text. Code spans are left
+    # alone and link text is paired on its own.
+    out: List[str] = []
+    # Open markers: (character, tag, index of their placeholder in out)
+    stack: List[Tuple[str, str, int]] = []
+    position = 0
+    for m in _SPAN.finditer(text):
+        out.append(text[position:m.start()])
+        position = m.end()
+        if m.group(1) is not None:
+            out.append(f'<font face="Courier">{m.group(1)}</font>')
+            continue
+        if m.group(2) is not None:
+            out.append(f'<link href="{m.group(3)}" color="blue">{_spans(m.group(2))}</link>')
+            continue
+        run = m.group(4)
+        char, count = run[0], len(run)
+        before = text[m.start() - 1] if m.start() else " "
+        after = text[m.end()] if m.end() < len(text) else " "
+        # '**' may sit inside a word; '*' and '_' only at its edges, so snake_case and 2*3*4 stay
+        inword = char == "*" and count > 1
+        if not before.isspace() and (inword or not after.isalnum()):
+            while count and any(opener[0] == char for opener in stack):
+                while stack[-1][0] != char:
+                    stack.pop()
+                if count == 2 and len(stack) > 1 and stack[-1][1] == "i" and stack[-2][1:] == ("b", stack[-1][2] - 1):
+                    # '***a** b*': the run opened as <b><i> but closes bold first
+                    index = stack[-2][2]
+                    out[index:index + 2] = [char, char * 2]
+                    stack[-2:] = [(char, "i", index), (char, "b", index + 1)]
+                tag = stack[-1][1]
+                size = 2 if tag == "b" else 1
+                if count < size:
+                    break
+                out[stack.pop()[2]] = f"<{tag}>"
+                out.append(f"</{tag}>")
+                count -= size
+        if count and not after.isspace() and (inword or not before.isalnum()):
+            while count:
+                tag, size = ("b", 2) if count >= 2 else ("i", 1)
+                stack.append((char, tag, len(out)))
+                out.append(char * size)
+                count -= size
+        out.append(char * count)
+    out.append(text[position:])
+    return "".join(out)
+
+
+def _paragraph(text: str, style: "ParagraphStyle", **kwargs) -> "Flowable":
+    # Plain text when ReportLab still rejects the markup: one odd span must not fail the report
+    from reportlab.platypus import Paragraph
+    try:
+        return Paragraph(inline_markup(text), style, **kwargs)
+    except ValueError as e:
+        logger.warning("Rendering a paragraph as plain text: %s", e)
+        return Paragraph(escape(text), style, **kwargs)
+
+
+def markdown_flowables(text: str, width: float) -> Iterator["Flowable"]:
+    # Headings, bullet/numbered lists, tables, code fences, rules and paragraphs, read one line
+    # at a time; each block is yielded as soon as it ends
+    from reportlab.platypus import Preformatted
+    from reportlab.platypus.flowables import HRFlowable
+    styles = get_styles()
+    paragraph: List[str] = []
+    rows: List[List[str]] = []
+    code: Optional[List[str]] = None
+    for line in StringIO(text):
+        line = line.rstrip("\r\n")
+        stripped = line.strip()
+        if code is not None:
+            if stripped.startswith("```"):
+                yield Preformatted("\n".join(code), styles['MdCode'])
+                code = None
+            else:
+                code.append(line)
+            continue
+        if rows and not stripped.startswith("|"):
+            yield _table(rows, width)
+            rows = []
+        heading, bullet, rule = _HEADING.match(stripped), _BULLET.match(line), _RULE.match(stripped)
+        if paragraph and (not stripped or heading or bullet or rule or stripped.startswith(("|", "```"))):
+            yield _paragraph(" ".join(paragraph), styles['CustomBody'])
+            paragraph = []
+        if not stripped:
+            continue
+        if stripped.startswith("```"):
+            code = []
+        elif stripped.startswith("|"):
+            if not _TABLE_RULE.match(stripped):
+                rows.append([cell.strip() for cell in stripped.strip("|").split("|")])
+        elif heading:
+            yield _paragraph(heading.group(2), styles['MdHeading'])
+        elif rule:
+            yield HRFlowable(width="100%", thickness=0.5, color="#9AA5B1", spaceBefore=4, spaceAfter=8)
+        elif bullet:
+            level = min(2, len(bullet.group(1).expandtabs(4)) // 2)
+            marker = bullet.group(2)
+            yield _paragraph(bullet.group(3), styles[f'MdBullet{level}'],
+                             bulletText=escape(marker) if marker[0].isdigit() else "•")
+        else:
+            paragraph.append(stripped)
+    if code is not None:
+        yield Preformatted("\n".join(code), styles['MdCode'])
+    if rows:
+        yield _table(rows, width)
+    if paragraph:
+        yield _paragraph(" ".join(paragraph), styles['CustomBody'])
+
+
+def _table(rows: List[List[str]], width: float) -> "Flowable":
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+    styles = get_styles()
+    columns = max(len(row) for row in rows)
+    data = [[_paragraph(cell, styles['MdHeaderCell' if i == 0 else 'MdCell'])
+             for cell in row + [''] * (columns - len(row))] for i, row in enumerate(rows)]
+    table = Table(data, colWidths=[width / columns] * columns, repeatRows=1, spaceAfter=12)
+    table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#9AA5B1')),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E6F4F6')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP')
+    ]))
+    return table
+
+
+def report_content(data: "SessionData") -> Dict[str, str]:
+    return {field: getattr(data, field) or '' for field in REPORT_FIELDS}
+
+
+def content_hash(content: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def write_pdf(content: Dict[str, str], target: Union[str, BinaryIO]):
+    # Renders the report into target, a path or a binary file object
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
+    start = time.perf_counter()
+    generated_at = datetime.fromisoformat(content['completed_at']) if content['completed_at'] else datetime.now()
+    doc = SimpleDocTemplate(target, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    styles = get_styles()
+    story = []
+    story.append(Paragraph("MANOVAT Analysis Report", styles['CustomTitle']))
+    story.append(Spacer(1, 0.2*inch))
+    story.append(Paragraph(f"Generated: {generated_at.strftime('%B %d, %Y at %H:%M')}", styles['CustomBody']))
+    story.append(Spacer(1, 0.5*inch))
+    story.append(Paragraph("1. PROBLEM UNDERSTANDING", styles['CustomHeading']))
+    story.extend(markdown_flowables(content['problem_statement'], doc.width))
+    story.append(Spacer(1, 0.2*inch))
+    story.append(Paragraph("Success Criteria:", styles['CustomHeading']))
+    story.extend(markdown_flowables(content['success_criteria'], doc.width))
+    story.append(Spacer(1, 0.3*inch))
+    story.append(Paragraph("2. AI SOLUTION", styles['CustomHeading']))
+    story.extend(markdown_flowables(content['solution'], doc.width))
+    story.append(PageBreak())
+    story.append(Paragraph("3. TECHNICAL REQUIREMENTS", styles['CustomHeading']))
+    story.extend(markdown_flowables(content['tech_requirements'], doc.width))
+    story.append(Spacer(1, 0.3*inch))
+    if content['human_factors_analysis']:
+        story.append(Paragraph("4. HUMAN FACTORS", styles['CustomHeading']))
+        story.extend(markdown_flowables(content['human_factors_analysis'], doc.width))
+        story.append(Spacer(1, 0.3*inch))
+    story.append(Paragraph("5. PROJECT TIMELINE", styles['CustomHeading']))
+    story.extend(markdown_flowables(content['timeline'], doc.width))
+    doc.build(story)
+    logger.info("Rendered PDF report in %.3fs (timeline %d chars)", time.perf_counter() - start,
+                len(content['timeline']))
+
+
+def render_pdf(content: Dict[str, str]) -> bytes:
+    buffer = BytesIO()
+    write_pdf(content, buffer)
+    return buffer.getvalue()
+
+
+def write_pdf_atomic(content: Dict[str, str], path: str):
+    # Readers never see a partial file: render next to it, then rename over it
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write_pdf(content, tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def report_path(data: "SessionData") -> str:
+    # Path of the rendered report, rendering it on first use; the files are shared by every
+    # process using the same REPORT_DIR
+    content = report_content(data)
+    path = os.path.join(config.REPORT_DIR, f"{content_hash(content)}.pdf")
+    try:
+        # Keeps recently used reports out of eviction
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    def render() -> str:
+        if not os.path.exists(path):
+            os.makedirs(config.REPORT_DIR, exist_ok=True)
+            write_pdf_atomic(content, path)
+            evict_reports()
+        return path
+
+    return _renders.run(path, render)[0]
+
+
+def open_report(data: "SessionData") -> BinaryIO:
+    # An open handle stays readable even if the file is evicted while it is being sent
+    for _ in range(3):
+        try:
+            return open(report_path(data), "rb")
+        except FileNotFoundError:
+            continue
+    raise FileNotFoundError("The report was evicted as soon as it was rendered; raise MANOVAT_PDF_CACHE_SIZE")
+
+
+def generate_pdf_report(data: "SessionData") -> bytes:
+    with open_report(data) as f:
+        return f.read()
+
+
+def evict_reports(max_files: Optional[int] = None, ttl: Optional[float] = None):
+    # Drops reports unused for ttl seconds, then the least recently used beyond max_files
+    max_files = config.PDF_CACHE_SIZE if max_files is None else max_files
+    ttl = config.REPORT_TTL if ttl is None else ttl
+    now = time.time()
+    with _evict_lock:
+        try:
+            entries = [entry for entry in os.scandir(config.REPORT_DIR) if entry.name.endswith((".pdf", ".tmp"))]
+        except FileNotFoundError:
+            return
+        files = []
+        for entry in entries:
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".tmp"):
+                # Left behind by a process that died mid-render (a render takes seconds)
+                if now - mtime > 3600:
+                    _remove(entry.path)
+            elif ttl and now - mtime > ttl:
+                _remove(entry.path)
+            else:
+                files.append((mtime, entry.path))
+        files.sort()
+        for _, path in files[:max(0, len(files) - max_files)]:
+            _remove(path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
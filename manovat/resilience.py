@@ -0,0 +1,112 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from manovat import config
+
+T = TypeVar('T')
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = config.OPENAI_RETRY_BASE,
+                  cap: float = config.OPENAI_RETRY_MAX) -> float:
+    # Exponential backoff with full jitter, never shorter than the server's Retry-After
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, min(retry_after, cap)) if retry_after is not None else delay
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures and rejects calls for `reset_timeout` seconds;
+    # then lets one trial call through (half-open) and closes again if it succeeds
+    def __init__(self, threshold: int = config.BREAKER_THRESHOLD, reset_timeout: float = config.BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            # A trial that never reported back (cancelled) doesn't block the next one forever
+            if self._trial_at is not None and now - self._trial_at < self.reset_timeout:
+                return False
+            self._trial_at = now
+            return True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_at = None
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class Coalescer:
+    # Identical requests in flight at the same time share one call: the first caller runs it,
+    # the others wait for its result (or exception)
+    def __init__(self):
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        # Returns (result, whether it came from another caller's call)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+
+class AsyncCoalescer:
+    # Same as Coalescer for coroutines; in-flight calls are tracked per event loop
+    def __init__(self):
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = \
+            weakref.WeakKeyDictionary()
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        future = inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+        future = inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; retrieve it so asyncio doesn't warn about it
+            future.exception()
+            raise
+        finally:
+            del inflight[key]
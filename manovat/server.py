@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from manovat import auth, config, metrics, report
+from manovat.engine import PROGRESS, ConversationState, Engine, Prompt, Session, StepResult, tokens_saved
+from manovat.llm import CircuitOpenError, LLMError
+from manovat.messages import Message
+from manovat.sessions import get_store
+
+# JSON/SSE API for the MANOVAT interview: uvicorn manovat.server:app
+# With a shared session store (MANOVAT_REDIS_URL) any worker or replica can serve any request.
+# SQLite and Redis stores block, so the handlers call the store from the thread pool.
+store = get_store()
+engine = Engine(config.OPENAI_API_KEY, checkpoint=store.save, background=not store.shared)
+
+
+def error(status: int, detail: str) -> JSONResponse:
+    return JSONResponse({"error": detail}, status_code=status)
+
+
+def message_json(message: Message) -> Dict[str, Any]:
+    return {"role": message.role, "content": message.content, "timestamp": message.timestamp}
+
+
+def result_json(session_id: str, result: StepResult) -> Dict[str, Any]:
+    return {
+        "session_id": session_id, "state": result.state, "progress": PROGRESS.get(result.state, 0),
+        "messages": [message_json(message) for message in result.messages],
+        "placeholder": result.placeholder, "done": result.done, "error": result.error or None
+    }
+
+
+def sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def authorized(request: Request) -> bool:
+    return auth.check_code(request.headers.get("x-access-code"))
+
+
+async def create_session(request: Request) -> Response:
+    if not authorized(request):
+        return error(401, "Invalid access code.")
+    session = await run_in_threadpool(store.create)
+    return JSONResponse(result_json(session.id, await engine.astep(session)), status_code=201)
+
+
+async def get_session(request: Request) -> Response:
+    if not authorized(request):
+        return error(401, "Invalid access code.")
+    session_id = request.path_params["session_id"]
+    session = await run_in_threadpool(store.get, session_id)
+    if session is None:
+        return error(404, "Unknown or expired session.")
+    result = StepResult(session.state, list(session.messages.visible_messages()), engine.placeholder(session),
+                        session.data.error)
+    return JSONResponse({**result_json(session_id, result), "usage": session.data.usage,
+                         "tokens_saved": tokens_saved(session.data)})
+
+
+async def delete_session(request: Request) -> Response:
+    if not authorized(request):
+        return error(401, "Invalid access code.")
+    await run_in_threadpool(store.delete, request.path_params["session_id"])
+    return Response(status_code=204)
+
+
+def llm_error(session_id: str, e: LLMError) -> Dict[str, Any]:
+    return {"session_id": session_id, "error": str(e), "retry": f"/sessions/{session_id}/retry"}
+
+
+async def post_message(request: Request) -> Response:
+    if not authorized(request):
+        return error(401, "Invalid access code.")
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    # Valid JSON that is not an object ([] or "hi") has no content either
+    content = body.get("content", "") if isinstance(body, dict) else ""
+    if not isinstance(content, str) or not content.strip():
+        return error(400, "Field 'content' is required.")
+    return await advance(request, content)
+
+
+async def retry_step(request: Request) -> Response:
+    if not authorized(request):
+        return error(401, "Invalid access code.")
+    return await advance(request, None)
+
+
+async def advance(request: Request, content: Optional[str]) -> Response:
+    # Runs one engine step: with the user's answer, or with None to retry a step that failed.
+    # The session is read after taking its lock, so the step starts from the last saved state.
+    session_id = request.path_params["session_id"]
+    if not await run_in_threadpool(store.try_lock, session_id):
+        if await run_in_threadpool(store.get, session_id) is None:
+            return error(404, "Unknown or expired session.")
+        return error(409, "A previous message for this session is still being processed.")
+    streaming = False
+    try:
+        session = await run_in_threadpool(store.get, session_id)
+        if session is None:
+            return error(404, "Unknown or expired session.")
+        if session.state == ConversationState.COMPLETE:
+            return error(409, "The interview is already complete.")
+        if content is not None and session.data.error:
+            return JSONResponse({**llm_error(session_id, LLMError(session.data.error)),
+                                 "detail": "The previous step failed; retry it before sending a new message."},
+                                status_code=409)
+        if content is not None and not engine.awaiting_input(session):
+            return JSONResponse({"session_id": session_id, "retry": f"/sessions/{session_id}/retry",
+                                 "error": "The previous step was interrupted; retry it before sending a new message."},
+                                status_code=409)
+        if "text/event-stream" in request.headers.get("accept", ""):
+            # The stream releases the lock when its step ends
+            streaming = True
+            return StreamingResponse(stream_step(session_id, session, content), media_type="text/event-stream")
+        try:
+            result = await engine.astep(session, content)
+        except LLMError as e:
+            headers = {"Retry-After": str(int(config.BREAKER_RESET))} if isinstance(e, CircuitOpenError) else None
+            return JSONResponse(llm_error(session_id, e), status_code=503, headers=headers)
+        return JSONResponse(result_json(session_id, result))
+    finally:
+        if not streaming:
+            await run_in_threadpool(store.unlock, session_id)
+
+
+async def stream_step(session_id: str, session: Session, content: Optional[str]) -> AsyncIterator[str]:
+    # Streamed generations are sent as "delta" events, then one "result" event (or "error")
+    queue: "asyncio.Queue[str]" = asyncio.Queue()
+
+    async def on_stream(prompt: Prompt, chunks: AsyncIterator[str]) -> str:
+        text = []
+        async for chunk in chunks:
+            text.append(chunk)
+            queue.put_nowait(sse("delta", {"stage": prompt.stage, "content": chunk}))
+        return "".join(text)
+
+    async def run() -> StepResult:
+        try:
+            return await engine.astep(session, content, on_stream=on_stream)
+        finally:
+            await run_in_threadpool(store.unlock, session_id)
+
+    task = asyncio.ensure_future(run())
+    while not task.done() or not queue.empty():
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.wait([getter, task], return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            yield getter.result()
+        else:
+            getter.cancel()
+    try:
+        yield sse("result", result_json(session_id, task.result()))
+    except LLMError as e:
+        yield sse("error", llm_error(session_id, e))
+
+
+async def get_report(request: Request) -> Response:
+    if not authorized(request):
+        return error(401, "Invalid access code.")
+    session_id = request.path_params["session_id"]
+    session = await run_in_threadpool(store.get, session_id)
+    if session is None:
+        return error(404, "Unknown or expired session.")
+    if session.state != ConversationState.COMPLETE:
+        return error(409, "The report is available once the interview is complete.")
+    # Streamed from the rendered file in chunks instead of being read into memory
+    f = await run_in_threadpool(report.open_report, session.data)
+    return StreamingResponse(read_chunks(f), media_type="application/pdf", headers={
+        "Content-Length": str(os.fstat(f.fileno()).st_size),
+        "Content-Disposition": f'attachment; filename="manovat_report_{session_id}.pdf"'
+    })
+
+
+async def read_chunks(f: BinaryIO, size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    try:
+        while chunk := await run_in_threadpool(f.read, size):
+            yield chunk
+    finally:
+        f.close()
+
+
+async def get_metrics(request: Request) -> Response:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(routes=[
+    Route("/sessions", create_session, methods=["POST"]),
+    Route("/sessions/{session_id}", get_session, methods=["GET"]),
+    Route("/sessions/{session_id}", delete_session, methods=["DELETE"]),
+    Route("/sessions/{session_id}/messages", post_message, methods=["POST"]),
+    Route("/sessions/{session_id}/retry", retry_step, methods=["POST"]),
+    Route("/sessions/{session_id}/report.pdf", get_report, methods=["GET"]),
+    Route("/metrics", get_metrics, methods=["GET"]),
+])
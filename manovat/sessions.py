@@ -0,0 +1,240 @@
+import dataclasses
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from manovat import config, shared
+from manovat.engine import Session, SessionData
+from manovat.messages import MessageStore
+
+SERIALIZATION_VERSION = 1
+
+
+def dump_session(session: Session) -> bytes:
+    payload = {
+        "v": SERIALIZATION_VERSION, "id": session.id, "s": session.state,
+        "m": [list(message) for message in session.messages.items],
+        "d": dataclasses.asdict(session.data)
+    }
+    return zlib.compress(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def load_session(blob: bytes) -> Session:
+    payload = json.loads(zlib.decompress(blob))
+    if payload["v"] != SERIALIZATION_VERSION:
+        raise ValueError(f"Unsupported session format {payload['v']}")
+    messages = MessageStore()
+    for role, content, timestamp, show_to_user in payload["m"]:
+        messages.restore(role, content, timestamp, show_to_user)
+    return Session(payload["id"], payload["s"], messages, SessionData(**payload["d"]))
+
+
+class SessionStore(ABC):
+    # Interface for session persistence. Engine checkpoints call save() after each state
+    # transition and step, so any process sharing the backend can pick a session up.
+    # False when only this process sees the sessions
+    shared = True
+
+    def __init__(self, ttl: float = config.SESSION_TTL):
+        self.ttl = ttl
+        # Background calls only live in this process; sessions loaded here get them back. Entries
+        # expire with their session, whichever backend holds it.
+        self._pending: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._pending_lock = threading.Lock()
+        self._locked: Dict[str, float] = {}
+
+    def create(self) -> Session:
+        session = Session()
+        self.save(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._load(session_id)
+        with self._pending_lock:
+            entry = self._pending.pop(session_id, None)
+            if session is not None and entry is not None:
+                session.pending = entry[0]
+                self._pending[session_id] = (entry[0], time.monotonic() + self.ttl)
+        return session
+
+    def save(self, session: Session):
+        now = time.monotonic()
+        with self._pending_lock:
+            if session.pending:
+                self._pending[session.id] = (session.pending, now + self.ttl)
+            else:
+                self._pending.pop(session.id, None)
+            for session_id in [key for key, (_, expires) in self._pending.items() if expires < now]:
+                del self._pending[session_id]
+        self._save(session)
+
+    def delete(self, session_id: str):
+        with self._pending_lock:
+            self._pending.pop(session_id, None)
+        self._delete(session_id)
+
+    def try_lock(self, session_id: str, ttl: float = config.SESSION_LOCK_TTL) -> bool:
+        # One step at a time per session: False while another caller holds it. This one only
+        # covers the process; stores shared between processes lock in the backend.
+        now = time.monotonic()
+        with self._pending_lock:
+            if self._locked.get(session_id, 0) > now:
+                return False
+            self._locked[session_id] = now + ttl
+            return True
+
+    def unlock(self, session_id: str):
+        with self._pending_lock:
+            self._locked.pop(session_id, None)
+
+    @abstractmethod
+    def _load(self, session_id: str) -> Optional[Session]:
+        ...
+
+    @abstractmethod
+    def _save(self, session: Session):
+        ...
+
+    @abstractmethod
+    def _delete(self, session_id: str):
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    # Keeps live Session objects; sessions expire after ttl seconds without access
+    shared = False
+
+    def __init__(self, ttl: float = config.SESSION_TTL):
+        super().__init__(ttl)
+        self._sessions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[1] < now:
+                self._sessions.pop(session_id, None)
+                return None
+            self._sessions[session_id] = (entry[0], now + self.ttl)
+            return entry[0]
+
+    def _save(self, session: Session):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session.id] = (session, now + self.ttl)
+            for session_id in [key for key, (_, expires) in self._sessions.items() if expires < now]:
+                del self._sessions[session_id]
+
+    def _delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path: str, ttl: float = config.SESSION_TTL):
+        super().__init__(ttl)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, payload BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS locks (id TEXT PRIMARY KEY, expires REAL NOT NULL)")
+
+    def try_lock(self, session_id: str, ttl: float = config.SESSION_LOCK_TTL) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM locks WHERE id = ? AND expires < ?", (session_id, now))
+            return self._conn.execute(
+                "INSERT OR IGNORE INTO locks VALUES (?, ?)", (session_id, now + ttl)
+            ).rowcount == 1
+
+    def unlock(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM locks WHERE id = ?", (session_id,))
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM sessions WHERE id = ? AND expires >= ?", (session_id, now)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE sessions SET expires = ? WHERE id = ?", (now + self.ttl, session_id))
+        return load_session(row[0]) if row is not None else None
+
+    def _save(self, session: Session):
+        now = time.time()
+        blob = dump_session(session)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session.id, blob, now + self.ttl))
+            self._conn.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+
+    def _delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+
+class RedisSessionStore(SessionStore):
+    # Works with any client exposing get/set/getex/delete (redis-py, fakeredis, ...); sessions and
+    # their locks are shared by every replica, so requests need no sticky routing
+    def __init__(self, client, ttl: float = config.SESSION_TTL, prefix: str = "manovat:session:"):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float = config.SESSION_TTL) -> "RedisSessionStore":
+        if url == config.REDIS_URL:
+            return cls(shared.get_redis(), ttl)
+        import redis
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def try_lock(self, session_id: str, ttl: float = config.SESSION_LOCK_TTL) -> bool:
+        return bool(self.client.set(self.prefix + "lock:" + session_id, 1, nx=True, ex=max(1, int(ttl))))
+
+    def unlock(self, session_id: str):
+        self.client.delete(self.prefix + "lock:" + session_id)
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        blob = self.client.getex(self.prefix + session_id, ex=int(self.ttl))
+        return load_session(blob) if blob is not None else None
+
+    def _save(self, session: Session):
+        self.client.set(self.prefix + session.id, dump_session(session), ex=int(self.ttl))
+
+    def _delete(self, session_id: str):
+        self.client.delete(self.prefix + session_id)
+
+
+def open_store(url: str) -> SessionStore:
+    # memory://, sqlite:///path/to/sessions.db or redis://host:port/db
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore.from_url(url)
+    if url in ("", "memory://"):
+        return MemorySessionStore()
+    raise ValueError(f"Unsupported session store URL: {url}")
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = open_store(config.SESSION_STORE)
+    return _store
@@ -0,0 +1,20 @@
+import threading
+from typing import Any, Optional
+
+from manovat import config
+
+# State shared by every replica (MANOVAT_REDIS_URL): sessions, the response cache and the
+# RPM/TPM buckets. One client, and so one connection pool, per process.
+_client: Optional[Any] = None
+_client_lock = threading.Lock()
+
+
+def get_redis() -> Optional[Any]:
+    # None when no shared backend is configured
+    global _client
+    if _client is None and config.REDIS_URL:
+        with _client_lock:
+            if _client is None:
+                import redis
+                _client = redis.Redis.from_url(config.REDIS_URL)
+    return _client
@@ -0,0 +1,74 @@
+import functools
+import logging
+from typing import Any, Optional, Sequence, Tuple
+
+from manovat import config
+
+logger = logging.getLogger(__name__)
+
+# Token counting for prompt budgets. Uses tiktoken (optional) with the model's encoding;
+# without it, or when its encoding files can't be loaded offline, about 4 characters per token.
+CHARS_PER_TOKEN = 4
+TRUNCATED = " [...]"
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str) -> Optional[Any]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # First use downloads the encoding unless TIKTOKEN_CACHE_DIR already has it
+        logger.warning("tiktoken encoding for %s unavailable, estimating tokens from length: %s", model, e)
+        return None
+
+
+def count(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding(config.OPENAI_MODEL)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    # Keeps the beginning of text within max_tokens (marker included)
+    if count(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - count(TRUNCATED))
+    encoding = _encoding(config.OPENAI_MODEL)
+    if encoding is None:
+        head = text[:keep * CHARS_PER_TOKEN]
+        # Cut on a word boundary when there is one close by
+        space = head.rfind(" ", len(head) - 40)
+        head = head[:space] if space > 0 else head
+    else:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:keep])
+    return head.rstrip() + TRUNCATED
+
+
+def fit(sections: Sequence[Tuple[str, str]], budget: int) -> Tuple[str, int]:
+    # Renders (label, text) sections as "LABEL: text" lines (just text for an empty label)
+    # within budget tokens, and returns the text and the tokens it saved. Short sections are
+    # kept whole; the longest ones are cut to an equal share of what is left.
+    sizes = [count(text) for _, text in sections]
+    overhead = sum(count(f"{label}: ") if label else 0 for label, _ in sections) + len(sections)
+    available = max(0, budget - overhead)
+    limits = list(sizes)
+    if sum(sizes) > available:
+        remaining = available
+        order = sorted(range(len(sections)), key=lambda i: sizes[i])
+        for position, i in enumerate(order):
+            limits[i] = min(sizes[i], remaining // (len(order) - position))
+            remaining -= limits[i]
+    texts = [text if limits[i] == sizes[i] else truncate(text, limits[i]) for i, (_, text) in enumerate(sections)]
+    rendered = "\n".join(f"{label}: {text}" if label else text for (label, _), text in zip(sections, texts))
+    return rendered, sum(sizes) - sum(count(text) for text in texts)
+
@@ -0,0 +1,71 @@
+import streamlit as st
+
+# Static page setup for app.py. Module-level constants are built once per process; Streamlit
+# reruns the script on every interaction but keeps imported modules.
+
+PAGE_CONFIG = dict(
+    page_title="MANOVAT - AI Solutions Consultant",
+    page_icon="🎯",
+    layout="wide",
+    initial_sidebar_state="expanded",
+    menu_items={'Get Help': None, 'Report a bug': None, 'About': None}
+)
+
+# CSS personalizzato
+CSS = """
+<style>
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+    .stDeployButton {display: none;}
+    [data-testid="collapsedControl"] {display: none !important;}
+    section[data-testid="stSidebar"] {width: 300px !important; min-width: 300px !important;}
+    section[data-testid="stSidebar"] > div {width: 300px !important; min-width: 300px !important;}
+    .stApp {background-color: #F7F9FB;}
+    [data-testid="stSidebar"] {background-color: #0B3C5D !important; min-width: 300px !important;}
+    [data-testid="stSidebar"] * {color: #F7F9FB !important;}
+    [data-testid="stSidebar"] .stMarkdown {color: #F7F9FB !important;}
+    h1 {color: #0B3C5D !important; font-weight: 700; font-size: 2.5rem; margin-bottom: 0.5rem;}
+    h2, h3 {color: #00A7B5 !important;}
+    .tagline {color: #00A7B5 !important; font-size: 1.2rem; font-weight: 400; margin-bottom: 2rem; font-style: italic;}
+    .stChatMessage {background-color: white; border-radius: 10px; padding: 1rem; margin-bottom: 1rem; box-shadow: 0 2px 4px rgba(11, 60, 93, 0.1);}
+    .stChatMessage [data-testid="stMarkdownContainer"] p {color: #2E3842 !important;}
+    .stChatInput {border-color: #00A7B5 !important;}
+    .stChatInput input {color: #2E3842 !important;}
+    .stButton > button {background-color: #FF6B57 !important; color: white !important; border: none; border-radius: 8px; padding: 0.5rem 2rem; font-weight: 600; transition: all 0.3s ease;}
+    .stButton > button:hover {background-color: #e55a47 !important; box-shadow: 0 4px 8px rgba(255, 107, 87, 0.3); transform: translateY(-2px);}
+    .stDownloadButton > button {background-color: #FF6B57 !important; color: white !important; border: none; border-radius: 8px; padding: 0.5rem 2rem; font-weight: 600;}
+    .stDownloadButton > button:hover {background-color: #e55a47 !important;}
+    .stProgress > div > div {background-color: #00A7B5 !important;}
+    p, li, span, div {color: #2E3842 !important;}
+    .stSpinner > div {border-top-color: #00A7B5 !important;}
+    .stSuccess {background-color: rgba(0, 167, 181, 0.1) !important; color: #0B3C5D !important; border-left: 4px solid #00A7B5 !important;}
+    .stInfo {background-color: rgba(11, 60, 93, 0.1) !important; color: #0B3C5D !important; border-left: 4px solid #0B3C5D !important;}
+    .stTextInput input {background-color: white !important; color: #2E3842 !important; border: 2px solid #00A7B5 !important;}
+    .stTextInput input:focus {border-color: #0B3C5D !important; box-shadow: 0 0 0 0.2rem rgba(0, 167, 181, 0.25) !important;}
+    [data-testid="stChatInput"] {border-color: #00A7B5 !important;}
+    [data-testid="stSidebar"] .element-container {background-color: rgba(247, 249, 251, 0.1); border-radius: 8px; padding: 0.5rem; margin-bottom: 0.5rem;}
+</style>
+"""
+
+
+# Streamlit login token (manovat.auth), read back from st.context.cookies
+AUTH_COOKIE = "manovat_auth"
+
+
+def remember_login(token: str, max_age: float):
+    # A cookie rather than the URL, which ends up in history, logs and Referer headers. The browser
+    # sends it with the websocket handshake, so a reconnect to another replica still finds it.
+    # Streamlit can't set cookies itself, so a script on the page does.
+    st.html(
+        f"<script>document.cookie = '{AUTH_COOKIE}={token}; Max-Age={int(max_age)}; Path=/; SameSite=Strict' "
+        f"+ (location.protocol === 'https:' ? '; Secure' : '');</script>",
+        unsafe_allow_javascript=True
+    )
+
+
+def setup_page():
+    # Both have to be sent on every run: Streamlit only keeps the elements of the current run,
+    # and the browser leaves an unchanged style element alone
+    st.set_page_config(**PAGE_CONFIG)
+    st.markdown(CSS, unsafe_allow_html=True)
@@ -0,0 +1,11 @@
+import pytest
+
+from manovat import tokens
+
+# The suite runs offline: no API calls (tests stub manovat.llm) and no tiktoken encoding downloads
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Token counts from the length heuristic, whether or not tiktoken and its encodings are installed
+    monkeypatch.setattr(tokens, "_encoding", lambda model: None)
@@ -0,0 +1,234 @@
+import itertools
+import json
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import pytest
+
+from manovat import config, engine as engine_module, llm
+from manovat.engine import (SOLUTION_QUESTIONS, ConversationState, Engine, Session, is_yes,
+                            parse_classification)
+
+
+@pytest.mark.parametrize("response, expected", [
+    ('{"a": true, "b": false}', {'a': True, 'b': False}),
+    ('{"a": true, "b": false, "c": true}', {'a': True, 'b': False}),
+    ('{"a": true}', None),
+    ('{"a": "yes", "b": false}', None),
+    ('[true, false]', None),
+    ('', None),
+    ('Sure! {"a": true}', None),
+])
+def test_parse_classification(response, expected):
+    assert parse_classification(response, ('a', 'b')) == expected
+
+
+@pytest.mark.parametrize("response, expected", [
+    ("y", True), ("Y.", True), ("'y'", True), (" yes\n", True), ("`y`", True),
+    ("", False), ("n", False), ("no", False), ("yes, but", False)
+])
+def test_is_yes(response, expected):
+    assert is_yes(response) == expected
+
+
+class FakeLLM:
+    # Stands in for llm.chat/llm.stream_chat: y/n checks answer from `answers`, the structured
+    # checks with `structured` (JSON text), everything else with a line naming its stage
+    def __init__(self, structured: str, answers: Dict[str, bool]):
+        self.structured = structured
+        self.answers = answers
+        self.stages: List[str] = []
+        self.fail: Optional[str] = None
+
+    def chat(self, api_key, system_prompt, user_message, temperature=0.5, max_tokens=1024, timeout=None,
+             max_retries=None, stats=None, limiter=None, response_format=None):
+        stage = stats.stage
+        self.stages.append(stage)
+        if stage == self.fail:
+            raise llm.LLMError(f"{stage} failed")
+        if response_format is not None:
+            return self.structured
+        if stage in self.answers:
+            return "y" if self.answers[stage] else ""
+        return f"## {stage}\n- generated"
+
+    def stream_chat(self, api_key, system_prompt, user_message, temperature=0.5, max_tokens=1024, timeout=None,
+                    stats=None, limiter=None):
+        yield from self.chat(api_key, system_prompt, user_message, temperature, max_tokens,
+                             stats=stats).splitlines(keepends=True)
+
+
+ANSWERS = {'is_small_biz': False, 'dataset_needed': True, 'dataset_sufficient': True, 'human_factors_detailed': False}
+
+
+@pytest.fixture
+def fake(monkeypatch, request):
+    fake = FakeLLM(getattr(request, "param", json.dumps(ANSWERS)), ANSWERS)
+    monkeypatch.setattr(llm, "chat", fake.chat)
+    monkeypatch.setattr(llm, "stream_chat", fake.stream_chat)
+    monkeypatch.setattr(engine_module, "get_index", lambda: None)
+    return fake
+
+
+def run(engine: Engine, session: Session):
+    result = engine.step(session)
+    for _ in range(50):
+        if result.done:
+            return result
+        result = engine.step(session, "An answer")
+    raise AssertionError(f"stuck in {session.state}")
+
+
+def test_interview_with_structured_checks(fake):
+    session = Session()
+    run(Engine("key"), session)
+    data = session.data
+    assert session.state == ConversationState.COMPLETE
+    assert data.solution_checks == {key: ANSWERS[key] for key in SOLUTION_QUESTIONS}
+    assert data.dataset_sufficient
+    assert not set(ANSWERS) & set(fake.stages)
+    assert data.tech_requirements == "## tech_requirements\n- generated"
+    assert data.timeline and data.completed_at
+
+
+@pytest.mark.parametrize("fake", ["not json", '{"is_small_biz": true}', ""], indirect=True)
+def test_interview_falls_back_to_yes_no_prompts(fake):
+    session = Session()
+    run(Engine("key"), session)
+    data = session.data
+    assert session.state == ConversationState.COMPLETE
+    assert data.solution_checks == {key: ANSWERS[key] for key in SOLUTION_QUESTIONS}
+    assert data.dataset_sufficient
+    assert fake.stages.count('solution_checks') == 1
+    assert all(fake.stages.count(key) == 1 for key in ANSWERS)
+    assert set(data.usage) >= {'solution', 'solution_summary', 'solution_checks', 'tech_requirements', 'timeline'}
+
+
+def test_structured_call_failure_falls_back(fake):
+    fake.fail = 'solution_checks'
+    session = Session()
+    run(Engine("key"), session)
+    assert session.data.solution_checks == {key: ANSWERS[key] for key in SOLUTION_QUESTIONS}
+    assert session.data.usage['solution_checks']['errors'] == 1
+
+
+class FakeClient:
+    # Stands in for the OpenAI client behind llm.chat. Checks are answered from `truth` (a phrase
+    # of the question -> the answer): JSON for the structured call, 'y' or nothing for a y/n prompt
+    def __init__(self, truth: Dict[str, bool]):
+        self.truth = truth
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, response_format=None, **kwargs):
+        system_prompt = messages[0]["content"]
+        if isinstance(response_format, dict):
+            content = json.dumps({line.split(": ", 1)[0]: self.answer(line) for line in system_prompt.splitlines()[1:]})
+        else:
+            answer = self.answer(system_prompt)
+            content = "## generated" if answer is None else "y" if answer else ""
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    def answer(self, text: str) -> Optional[bool]:
+        return next((value for phrase, value in self.truth.items() if phrase in text.lower()), None)
+
+
+@pytest.mark.parametrize("truth", [
+    dict(zip(('micro business', 'dataset for development', 'physical activity', 'sufficient'), values))
+    for values in itertools.product((True, False), repeat=4)
+])
+def test_structured_and_yes_no_checks_agree(monkeypatch, truth):
+    # Through llm.chat with a stubbed client, and no response cache: asking every question in one
+    # structured call gives the same answers as one y/n prompt per question
+    monkeypatch.setattr(llm, "get_client", lambda api_key, base_url=None: FakeClient(truth))
+    monkeypatch.setattr(llm, "get_cache", lambda: None)
+    monkeypatch.setattr(llm, "stream_chat", lambda *args, **kwargs: iter(["## generated"]))
+    monkeypatch.setattr(engine_module, "get_index", lambda: None)
+    checks = []
+    for structured in (True, False):
+        monkeypatch.setattr(config, "STRUCTURED_CHECKS", structured)
+        session = Session()
+        run(Engine("key"), session)
+        # The structured call was understood, so only the fallback asks one question at a time
+        assert bool(set(SOLUTION_QUESTIONS) & set(session.data.usage)) != structured
+        checks.append((session.data.solution_checks, session.data.dataset_sufficient))
+    assert checks[0] == checks[1]
+    assert checks[0][0] == {'is_small_biz': truth['micro business'], 'dataset_needed': truth['dataset for development'],
+                            'human_factors_detailed': truth['physical activity']}
+    # Small businesses skip the dataset stage
+    assert checks[0][1] == (not truth['micro business'] and truth['dataset for development'] and truth['sufficient'])
+
+
+def test_failed_step_is_retried_without_input(fake):
+    engine, session = Engine("key"), Session()
+    engine.step(session)
+    engine.step(session, "Forecast demand")
+    fake.fail = 'solution'
+    with pytest.raises(llm.LLMError):
+        engine.step(session, "Fewer stockouts")
+    assert session.state == ConversationState.ANALYZING_SOLUTION and session.data.error
+    assert engine.placeholder(session) is None
+    with pytest.raises(ValueError):
+        engine.step(session, "An answer")
+    fake.fail = None
+    result = engine.step(session)
+    assert not result.error and engine.awaiting_input(session)
+    assert session.data.success_criteria == "Fewer stockouts"
+
+
+def test_input_only_answers_a_question(fake):
+    engine, session = Engine("key"), Session()
+    engine.step(session)
+    engine.step(session, "Forecast demand")
+    # A step interrupted after the answer was taken: no question is on screen
+    session.state = ConversationState.ANALYZING_SOLUTION
+    session.data.question_asked = False
+    assert not engine.awaiting_input(session)
+    with pytest.raises(ValueError):
+        engine.step(session, "An answer")
+    engine.step(session)
+    assert engine.awaiting_input(session) and engine.placeholder(session)
+
+
+def test_completed_interview_reuses_the_lookup_vector(fake, monkeypatch):
+    from manovat.index import AnalysisIndex
+    texts = []
+    monkeypatch.setattr(llm, "embed", lambda api_key, batch, stats=None, limiter=None:
+                        texts.extend(batch) or [[1.0, float(len(text))] for text in batch])
+    index = AnalysisIndex()
+    session = Session()
+    run(Engine("key", index=index), session)
+    # Only the lookup embeds the problem; the completed analysis is added with the same vector
+    assert len(texts) == 1
+    assert len(index) == 1 and index.search([1.0, float(len(texts[0]))])[0].entry['id'] == session.id
+    assert session.data.reuse_vector == []
+
+
+def test_async_interview(fake, monkeypatch):
+    import asyncio
+
+    async def achat(*args, **kwargs):
+        return fake.chat(*args, **kwargs)
+
+    async def astream_chat(*args, **kwargs):
+        for chunk in fake.stream_chat(*args, **kwargs):
+            yield chunk
+
+    monkeypatch.setattr(llm, "achat", achat)
+    monkeypatch.setattr(llm, "astream_chat", astream_chat)
+    fake.structured = "not json"
+    saves = []
+    engine, session = Engine("key", checkpoint=lambda s: saves.append((s.state, threading.get_ident()))), Session()
+
+    async def interview():
+        result = await engine.astep(session)
+        while not result.done:
+            result = await engine.astep(session, "An answer")
+
+    asyncio.run(interview())
+    assert session.data.solution_checks == {key: ANSWERS[key] for key in SOLUTION_QUESTIONS}
+    assert 'tech_requirements' in session.data.usage
+    # Saved before the calls of each new state and after each step, from a thread rather than the event loop
+    assert {state for state, _ in saves} >= {ConversationState.ANALYZING_SOLUTION, ConversationState.TECH_ANALYSIS,
+                                             ConversationState.DATASET_QUESTIONS, ConversationState.COMPLETE}
+    assert threading.get_ident() not in {thread for _, thread in saves}
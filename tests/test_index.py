@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+from manovat.index import AnalysisIndex
+
+DIMENSIONS = 8
+
+
+def vector(i: int) -> np.ndarray:
+    return np.random.default_rng(i).standard_normal(DIMENSIONS).astype(np.float32)
+
+
+def write_rows(path: str, start: int, count: int):
+    index = AnalysisIndex(path, "test")
+    for i in range(start, start + count):
+        index.add(vector(i), {"id": str(i)})
+
+
+def test_reopen(tmp_path):
+    path = str(tmp_path / "index")
+    index = AnalysisIndex(path, "test")
+    for i in range(3):
+        index.add(vector(i), {"id": str(i)})
+    reopened = AnalysisIndex(path, "test")
+    assert len(reopened) == 3
+    assert reopened.search(vector(1), 0.99)[0].entry == {"id": "1"}
+
+
+def test_processes_share_a_path(tmp_path):
+    path = str(tmp_path / "index")
+    reader = AnalysisIndex(path, "test")
+    context = multiprocessing.get_context("spawn")
+    writers = [context.Process(target=write_rows, args=(path, 100 * n, 50)) for n in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+        assert writer.exitcode == 0
+    # Every row's vector lines up with its entry, and an open index sees the other processes' rows
+    for i in (0, 49, 149, 349):
+        assert reader.search(vector(i), 0.99)[0].entry == {"id": str(i)}
+    assert len(reader) == 200
+    assert len(AnalysisIndex(path, "test")) == 200
+
+
+def test_half_written_row(tmp_path):
+    path = str(tmp_path / "index")
+    index = AnalysisIndex(path, "test")
+    index.add(vector(0), {"id": "0"})
+    # A writer that crashed between appending its entry and its vector
+    with open(path + ".jsonl", "ab") as f:
+        f.write(b'{"id": "1"}\n')
+    assert len(AnalysisIndex(path, "test")) == 1
+    assert os.path.getsize(path + ".jsonl") == len(b'{"id": "0"}\n')
+    index.add(vector(2), {"id": "2"})
+    assert AnalysisIndex(path, "test").search(vector(2), 0.99)[0].entry == {"id": "2"}
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("reportlab")
+
+from reportlab.platypus import Paragraph, Table  # noqa: E402
+
+from manovat import report  # noqa: E402
+from manovat.report import inline_markup, markdown_flowables  # noqa: E402
+
+
+@pytest.mark.parametrize("text, markup", [
+    ("**bold** and *italic*", "<b>bold</b> and <i>italic</i>"),
+    ("__bold__ _italic_", "<b>bold</b> <i>italic</i>"),
+    ("***x***", "<b><i>x</i></b>"),
+    ("**Phase 1 – *Discovery***", "<b>Phase 1 – <i>Discovery</i></b>"),
+    ("*a **b***", "<i>a <b>b</b></i>"),
+    ("***a** b*", "<i><b>a</b> b</i>"),
+    ("**unclosed", "**unclosed"),
+    ("**a *b** c*", "**a <i>b</i>* c*"),
+    ("snake_case and 2*3*4", "snake_case and 2*3*4"),
+    ("`a*b*` x < y & z", '<font face="Courier">a*b*</font> x &lt; y &amp; z'),
+    ("[*the* docs](https://x.org/a_b)", '<link href="https://x.org/a_b" color="blue"><i>the</i> docs</link>'),
+])
+def test_inline_markup(text, markup):
+    assert inline_markup(text) == markup
+
+
+@pytest.mark.parametrize("text", ["*a _b* c_", "*a **b* c**", "****", "** a **", "_*x_*"])
+def test_inline_markup_always_parses(text):
+    Paragraph(inline_markup(text), report.get_styles()['CustomBody'])
+
+
+def test_markdown_flowables():
+    text = ("# **Plan *A***\n\nOne\nparagraph.\n\n- ***Key*** point\n  - nested\n1. first\n\n"
+            "| a | **b *c*** |\n|---|---|\n| 1 | 2 |\n\n```\ncode *here*\n```\n---\nEnd")
+    kinds = [type(flowable).__name__ for flowable in markdown_flowables(text, 400)]
+    assert kinds == ['Paragraph', 'Paragraph', 'Paragraph', 'Paragraph', 'Paragraph', 'Table', 'Preformatted',
+                     'HRFlowable', 'Paragraph']
+
+
+def test_markdown_flowables_falls_back_to_plain_text(monkeypatch):
+    monkeypatch.setattr(report, "inline_markup", lambda text: "<b><i>x</b></i>")
+    flowables = list(markdown_flowables("**x** & y\n\n| *a* |\n|---|\n| b |", 400))
+    assert flowables[0].text == "**x** &amp; y"
+    assert isinstance(flowables[1], Table)
+
+
+def test_render_pdf():
+    content = {field: "**Step 1 – *Define***\n\n- item" for field in report.REPORT_FIELDS}
+    content['completed_at'] = "2025-01-01T00:00:00"
+    assert report.render_pdf(content).startswith(b"%PDF")
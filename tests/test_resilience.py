@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from manovat.ratelimit import RateLimiter, TokenBucket
+from manovat.resilience import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(threshold=3, reset_timeout=10)
+    for _ in range(2):
+        breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+    clock.now += 9
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_trial(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10)
+    breaker.failure()
+    clock.now += 10
+    # One trial call at a time
+    assert breaker.allow()
+    assert not breaker.allow()
+    # A failed trial opens it again for the full timeout
+    breaker.failure()
+    clock.now += 5
+    assert not breaker.allow()
+    clock.now += 5
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_trial_that_never_reports_back(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10)
+    breaker.failure()
+    clock.now += 10
+    assert breaker.allow()
+    clock.now += 10
+    assert breaker.allow()
+
+
+def test_success_resets_failures(clock):
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10)
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.allow()
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(60, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Callers queue up: each one waits for the refill of what those before it took
+    assert bucket.reserve() == pytest.approx(1)
+    assert bucket.reserve() == pytest.approx(2)
+    clock.now += 2
+    assert bucket.reserve() == pytest.approx(1)
+
+
+def test_token_bucket_refill_stops_at_capacity(clock):
+    bucket = TokenBucket(60, capacity=5)
+    bucket.reserve(5)
+    clock.now += 3600
+    assert bucket.reserve(5) == 0
+    assert bucket.reserve(1) == pytest.approx(1)
+
+
+def test_rate_limiter(clock):
+    limiter = RateLimiter(rpm=60, tpm=600)
+    assert limiter.reserve(600) == 0
+    # The token budget is the tighter limit here
+    assert limiter.reserve(300) == pytest.approx(30)
+    assert RateLimiter(rpm=0, tpm=0).reserve(10 ** 6) == 0
+
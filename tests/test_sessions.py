@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from manovat.engine import ConversationState, Session
+from manovat.sessions import MemorySessionStore, SessionStore, SQLiteSessionStore, dump_session, load_session
+
+
+def make_session() -> Session:
+    session = Session(state=ConversationState.DATASET_QUESTIONS)
+    session.messages.append("assistant", "**Question 1:** Which datasets are available?")
+    session.messages.append("user", "Sales history — 3 years, «CSV»")
+    session.messages.append("assistant", "Proceeding...", False)
+    data = session.data
+    data.problem_statement = "Forecast demand"
+    data.solution_checks = {'is_small_biz': False, 'dataset_needed': True}
+    data.dataset_info = {"Which datasets are available?": "Sales history"}
+    data.usage = {'solution': {'calls': 1, 'prompt_tokens': 120, 'completion_tokens': 300}}
+    data.question_asked = True
+    return session
+
+
+def test_round_trip():
+    session = make_session()
+    session.pending['tech_requirements'] = object()
+    restored = load_session(dump_session(session))
+    assert restored.id == session.id
+    assert restored.state == session.state
+    assert restored.data == session.data
+    assert [tuple(message) for message in restored.messages.items] == \
+        [tuple(message) for message in session.messages.items]
+    # Background calls stay in the process that started them
+    assert restored.pending == {}
+
+
+def test_unknown_format():
+    import json
+    import zlib
+    blob = zlib.compress(json.dumps({"v": 0}).encode("utf-8"))
+    with pytest.raises(ValueError):
+        load_session(blob)
+
+
+@pytest.mark.parametrize("make_store", [MemorySessionStore, lambda: SQLiteSessionStore(":memory:")])
+def test_store(make_store):
+    store = make_store()
+    session = make_session()
+    store.save(session)
+    loaded = store.get(session.id)
+    assert loaded.data == session.data and loaded.state == session.state
+    assert store.get("missing") is None
+    store.delete(session.id)
+    assert store.get(session.id) is None
+
+
+@pytest.mark.parametrize("make_store", [MemorySessionStore, lambda: SQLiteSessionStore(":memory:")])
+def test_store_lock(make_store):
+    store = make_store()
+    assert store.try_lock("a")
+    assert not store.try_lock("a")
+    assert store.try_lock("b")
+    store.unlock("a")
+    assert store.try_lock("a")
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda: MemorySessionStore(ttl=0.05), lambda: SQLiteSessionStore(":memory:", ttl=0.05)
+])
+def test_pending_calls(make_store):
+    store = make_store()
+    idle, busy = store.create(), store.create()
+    store.get(idle.id)
+    busy.pending['tech_requirements'] = "call"
+    store.save(busy)
+    assert store.get(busy.id).pending == {'tech_requirements': "call"}
+    assert list(store._pending) == [busy.id]
+    # Expired sessions take their pending calls with them
+    time.sleep(0.1)
+    store.save(store.create())
+    assert store.get(busy.id) is None
+    assert store._pending == {}
+
+
+def test_incomplete_store():
+    class NoDelete(SessionStore):
+        def _load(self, session_id):
+            return None
+
+        def _save(self, session):
+            pass
+
+    with pytest.raises(TypeError):
+        NoDelete()
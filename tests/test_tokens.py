@@ -0,0 +1,31 @@
+from manovat import tokens
+
+
+def test_count():
+    assert tokens.count("") == 0
+    assert tokens.count("abcd") == 1
+    assert tokens.count("abcde") == 2
+
+
+def test_truncate():
+    text = "word " * 100
+    assert tokens.truncate(text, 200) == text
+    cut = tokens.truncate(text, 20)
+    assert cut.endswith(tokens.TRUNCATED)
+    assert tokens.count(cut) <= 20
+
+
+def test_fit_within_budget_keeps_everything():
+    text, saved = tokens.fit([("A", "short"), ("", "plain")], 100)
+    assert text == "A: short\nplain"
+    assert saved == 0
+
+
+def test_fit_cuts_the_longest_sections():
+    short, long = "brief answer", "lorem ipsum " * 200
+    text, saved = tokens.fit([("SHORT", short), ("LONG", long), ("OTHER", long)], 200)
+    lines = text.split("\n")
+    assert lines[0] == f"SHORT: {short}"
+    assert all(line.endswith(tokens.TRUNCATED) for line in lines[1:])
+    assert tokens.count(text) <= 200
+    assert saved == 2 * tokens.count(long) - sum(tokens.count(line.split(": ", 1)[1]) for line in lines[1:])